@@ -12,6 +12,7 @@ HUE_LOWER
 HUE_UPPER
 BRIGHTNESS
 SATURATION
+GAMMA
 
 Because the LEDs response is not linear, the HUE is resampled with
 a sigmoid curve bounded at (0, 0) and (1, 1) to bias the colors.
@@ -22,12 +23,20 @@ a = 0.5; b = 1  # Linear
 a = 3  ; b = 4  # Biased toward red
 a = 1  ; b = 4  # Biased toward blue
 """
+from array import array
 import board
 import math
 import time
 import analogio
-import digitalio
+import curves
+from buttons import Buttons, ClickButton
+from filters import Filter
+from hsv import HUE_STEPS, fill_hsv
+from memory import memory_report
 from nprainbow import NeoPixelRainbow
+from recorder import Recorder
+from scheduler import Scheduler
+from tablecache import TableCache
 
 
 # NEOPIXEL CONSTANTS
@@ -44,6 +53,9 @@ HUE_LOWER = 0.0  # Hue offset initial color
 HUE_UPPER = 1.0  # Hue offset final color
 BRIGHTNESS = 0.2  # Initial brightness
 SATURATION = 1.0  # Initial saturation
+GAMMA = 1.0  # LEDs gamma correction, baked into the color tables
+ROTATE = True  # Loop the rainbow by rotating a prerendered ring of pixels
+TABLE_CACHE = "color_tables"  # Folder keeping the color tables, None disables it
 
 # CONFIGURATION RANGES
 SPEED_RANGE = (-64, 64)
@@ -58,6 +70,24 @@ BRIGHTNESS_RANGE = (0, MAX_BRIGHTNESS)
 SIGMOID_A = 3  # Hue bias parameter a
 SIGMOID_B = 5  # Hue bias parameter b
 
+# SCHEDULER CONFIGURATION
+FRAME_RATE = 50  # Frames per second
+BUTTONS_RATE = 100  # Buttons readings per second
+POTS_RATE = 250  # Potentiometers readings per second
+REPORT_PERIOD = 0  # Seconds between frame rate reports, 0 disables them
+MEMORY_REPORT = False  # Print the bytes held by each component at boot
+
+# Garbage collection between frames rather than in the middle of one
+GC_IDLE = None  # Idle seconds needed to collect, like 0.005. None disables it
+GC_AFTER = 4096  # Bytes allocated before collecting again
+
+# Smaller tables and buffers for boards with little RAM, like the SAMD21
+LOW_MEMORY = False
+
+# Frame recording, see recorder.py. Writing to CIRCUITPY needs boot.py
+RECORD_PATH = None  # File the frames are recorded to, like "/frames.bin"
+RECORD_FRAMES = 3000  # Frames recorded at most
+
 # BUTTONS CONFIGURATION
 BTN1_PIN = board.GP11  # Mode button
 BTN2_PIN = board.GP7  # On/Off/Reset button
@@ -65,61 +95,21 @@ POT1_PIN = board.A0
 POT2_PIN = board.A2
 
 # Peripherals
-class ClickButton:
-    PRESSED = "PRESSED"
-    RELEASED = "RELEASED"
-
-    def __init__(
-        self,
-        pin,
-        press_callback=lambda: None,
-        release_callback=lambda: None,
-        hold_callback=lambda: None,
-        hold_callback_timeout=1,
-    ):
-        self.button = digitalio.DigitalInOut(pin)
-        self.button.direction = digitalio.Direction.INPUT
-        self.button.pull = digitalio.Pull.DOWN
-        self.pin = pin
-        self._value = self.button.value
-        self._previous_value = self.button.value
-        self.press_callback = press_callback
-        self.release_callback = release_callback
-        self.hold_callback = hold_callback
-        self.hold_callback_timeout = hold_callback_timeout
-        self.skip_release = False
-        self.holding = False
-        self.holding_tick = 0
-
-    def update(self):
-        self._previous_value = self._value
-        self._value = self.button.value
-        if self._previous_value != self._value:
-            if self._value:
-                self.press_callback()
-                self.holding = True
-                self.holding_tick = time.monotonic()
-            else:
-                if self.skip_release:
-                    self.skip_release = False
-                    return
-                self.release_callback()
-                self.holding = False
-        else:
-            if (
-                self.holding
-                and time.monotonic() - self.holding_tick > self.hold_callback_timeout
-            ):
-                self.hold_callback()
-                self.holding = False
-                self.skip_release = True
-
-
 class Potentiometer:
     change_threshold = 300
     _min_value = 2000
     _max_value = 63500
     window_size = 16
+    low_memory_bits = 8  # Curve table resolution with `low_memory`
+    filter_mode = Filter.MEAN
+    profiles = {
+        "linear": curves.LINEAR,
+        "quadratic": curves.QUADRATIC,
+        "cubic": curves.CUBIC,
+        "symmetric_cubic": curves.SYMMETRIC_CUBIC,
+        "symmetric_fifth": curves.SYMMETRIC_FIFTH,
+        "symmetric_seventh": curves.SYMMETRIC_SEVENTH,
+    }
 
     def __init__(
         self,
@@ -129,6 +119,7 @@ class Potentiometer:
         callback,
         profile="linear",
         name=None,
+        low_memory=False,
     ):
         self.analog_in = analog_in
         self.initial_value = initial_value
@@ -139,30 +130,26 @@ class Potentiometer:
         self.callback = callback
         self.name = name
         self.profile = profile
-        if self.profile == "linear":
-            self._profile = lambda x: x
-        elif self.profile == "quadratic":
-            self._profile = lambda x: x ** 2
-        elif self.profile == "cubic":
-            self._profile = lambda x: x ** 3
-        elif self.profile == "symmetric_cubic":
-            self._profile = lambda x: (((2 * x) - 1) ** 3 + 1) / 2
-        elif self.profile == "symmetric_fifth":
-            self._profile = lambda x: (((2 * x) - 1) ** 5 + 1) / 2
-        elif self.profile == "symmetric_seventh":
-            self._profile = lambda x: (((2 * x) - 1) ** 5 + 1) / 2
+        if isinstance(profile, curves.Curve):
+            self.curve = profile
+        elif profile in self.profiles:
+            self.curve = self.profiles[profile]
         else:
-            raise NotImplemented(f"Profile {self.profile} not implemented")
-        self.window = [self.analog_in.value for _ in range(self.window_size)]
+            raise NotImplementedError(f"Profile {self.profile} not implemented")
+        bits = self.low_memory_bits if low_memory else self.curve.bits
+        self._table = self.curve.table(self._min_value, self._max_value, bits)
+        self._shift = 16 - bits
+        self._scale = self.delta / curves.FULL_SCALE
+        self.filter = Filter(
+            self.window_size, self.analog_in.value, mode=self.filter_mode
+        )
         self.locked = False
         self.lock(self.initial_value)
         self.previous_raw_value = self.raw_value
 
     def update(self):
         if not self.locked:
-            self.window.pop(0)
-            self.window.append(self.analog_in.value)
-            raw_value = self.raw_value
+            raw_value = self.filter.add(self.analog_in.value)
             val_diff = abs(self.previous_raw_value - raw_value)
             if val_diff > self.change_threshold:
                 self.previous_raw_value = raw_value
@@ -178,7 +165,7 @@ class Potentiometer:
     def raw_value(self):
         if self.locked:
             return self.locked_raw_value
-        return sum(self.window) / self.window_size
+        return self.filter.value
 
     @property
     def bound_value(self):
@@ -191,22 +178,26 @@ class Potentiometer:
 
     @property
     def value(self):
-        return self.transform(self.bound_value)
-
-    def transform(self, value):
-        return self._profile(value) * self.delta + self.min_value
+        return self.min_value + self._table[self.raw_value >> self._shift] * self._scale
 
     def __str__(self):
         return f"{self.name}: {self.value}"
 
+    def memory(self):
+        """
+        Buffers held by the pot, by name. The curve table is shared by
+        the pots with the same curve.
+        """
+        return {
+            "window": self.filter.window,
+            "sorted_window": getattr(self.filter, "_sorted", None),
+            "curve_table": self._table,
+        }
+
     def lock(self, value=None):
         if value is not None:
-            self.locked_raw_value = self.bisection(
-                lambda x: self.transform((x - self._min_value) / self._delta) - value,
-                0,
-                1e8,
-                1000,
-                100,
+            self.locked_raw_value = self.curve.reading(
+                (value - self.min_value) / self.delta, self._min_value, self._max_value
             )
             self.locked = True
         elif not self.locked:
@@ -216,64 +207,20 @@ class Potentiometer:
     def unlock(self):
         self.locked = False
 
-    @staticmethod
-    def bisection(f, a, b, epsilon, N):
-        """
-        https://personal.math.ubc.ca/~pwalls/math-python/roots-optimization/bisection/
-        Approximate solution of f(x)=0 on interval [a,b] by bisection method.
-
-        Parameters
-        ----------
-        f : function
-            The function for which we are trying to approximate a solution f(x)=0.
-        a,b : numbers
-            The interval in which to search for a solution. The function returns
-            None if f(a)*f(b) >= 0 since a solution is not guaranteed.
-        N : (positive) integer
-            The number of iterations to implement.
-
-        Returns
-        -------
-        x_N : number
-            The midpoint of the Nth interval computed by the bisection method. The
-            initial interval [a_0,b_0] is given by [a,b]. If f(m_n) == 0 for some
-            midpoint m_n = (a_n + b_n)/2, then the function returns this solution.
-            If all signs of values f(a_n), f(b_n) and f(m_n) are the same at any
-            iteration, the bisection method fails and return None.
-
-        Examples
-        --------
-        >>> f = lambda x: x**2 - x - 1
-        >>> bisection(f,1,2,25)
-        1.618033990263939
-        >>> f = lambda x: (2*x - 1)*(x - 3)
-        >>> bisection(f,0,1,10)
-        0.5
-        """
-        if f(a) * f(b) >= 0:
-            return None
-        a_n = a
-        b_n = b
-        for n in range(1, N + 1):
-            m_n = (a_n + b_n) / 2
-            f_m_n = f(m_n)
-            if f(a_n) * f_m_n < 0:
-                a_n = a_n
-                b_n = m_n
-            elif f(b_n) * f_m_n < 0:
-                a_n = m_n
-                b_n = b_n
-            elif abs(f_m_n) < epsilon:
-                return m_n
-            else:
-                return None
-        return (a_n + b_n) / 2
-
 
 class PotSequence:
+    """
+    Cycles the pots through `modes`, drawing their values over the
+    first pixels. With `low_memory` the indicator colors are converted
+    when drawn instead of kept in a table. Drawing allocates nothing,
+    colors are written as packed ints.
+    """
+
     n_colors = 64
 
-    def __init__(self, modes, pixels, indicator_timeout=5):
+    def __init__(
+        self, modes, pixels, indicator_timeout=5, table_cache=None, low_memory=False
+    ):
         self.modes = modes
         self.current_index = 0
         self.pixels = pixels
@@ -281,12 +228,24 @@ class PotSequence:
         self.all_pots = [pot for mode in self.modes for pot in mode["pots"]]
         self.n_indicators = 1 + len(self.all_pots)
         self._timeout = time.monotonic() + self.indicator_timeout
-        self.color_table = NeoPixelRainbow.create_color_table(
-            steps=int(
-                3 * self.n_colors / 2
-            ),  # Final color should be blue. Psst thiss just a trick
-            saturation=1.0,
-        )
+        # Final color should be blue. Psst thiss just a trick
+        steps = int(3 * self.n_colors / 2)
+        self._steps = steps
+
+        def build():
+            return NeoPixelRainbow.create_color_table(steps, saturation=1.0)
+
+        if low_memory:
+            self.color_table = None
+            # Scratch hue and color for `fill_hsv`
+            self._hue = array("H", [0])
+            self._rgb = bytearray(3)
+        elif table_cache is None:
+            self.color_table = build()
+        else:
+            self.color_table = table_cache.load(
+                ("pot_sequence", steps), 3 * steps, build
+            )
         print(self)
 
     def __str__(self):
@@ -306,20 +265,63 @@ class PotSequence:
         self._timeout = time.monotonic() + self.indicator_timeout
 
     def update(self):
+        self.poll()
+        self.draw()
+
+    def poll(self):
+        """
+        Reads the pots of the current mode
+        """
         has_changed = False
         for pot in self.modes[self.current_index]["pots"]:
             has_changed |= pot.update()
         if has_changed:
             self._timeout = time.monotonic() + self.indicator_timeout
+
+    def color(self, index):
+        """
+        Indicator color `index`, out of `n_colors`, packed as `0xRRGGBB`
+        """
+        table = self.color_table
+        t = 3 * index
+        if table is None:
+            self._hue[0] = index * HUE_STEPS // self._steps
+            table = fill_hsv(self._rgb, self._hue)
+            t = 0
+        return (table[t] << 16) | (table[t + 1] << 8) | table[t + 2]
+
+    @staticmethod
+    def _scale(color, lut):
+        """
+        Packed `color` with its channels looked up in `lut`
+        """
+        return (
+            (lut[color >> 16] << 16)
+            | (lut[(color >> 8) & 0xFF] << 8)
+            | lut[color & 0xFF]
+        )
+
+    def memory(self):
+        """
+        Buffers held by the sequence, by name
+        """
+        return {"color_table": self.color_table}
+
+    def draw(self):
+        """
+        Draws the mode and pots indicators over the strip
+        """
         if self._timeout != 0:
             if time.monotonic() < self._timeout:
-                self.pixels[0] = self.modes[self.current_index]["color"]
-                for i, pot in enumerate(self.all_pots):
-                    color_idx = math.floor((self.n_colors - 1) * pot.bound_value)
-                    self.pixels[i + 1] = list(
-                        self.color_table[3 * color_idx : 3 * (color_idx + 1)]
-                    )
-                self.pixels[self.n_indicators] = [0, 0, 0]
+                # The strip runs at full brightness, scale the indicators
+                lut = self.pixels.lut
+                r, g, b = self.modes[self.current_index]["color"]
+                self.pixels[0] = self._scale((r << 16) | (g << 8) | b, lut)
+                pots = self.all_pots
+                for i in range(len(pots)):
+                    color_idx = math.floor((self.n_colors - 1) * pots[i].bound_value)
+                    self.pixels[i + 1] = self._scale(self.color(color_idx), lut)
+                self.pixels[self.n_indicators] = 0
             else:
                 self._timeout = 0
 
@@ -336,6 +338,7 @@ def locked_sigmoid(x, a, b):
 
 # Sweet main
 def main():
+    table_cache = None if TABLE_CACHE is None else TableCache(TABLE_CACHE)
     pixels = NeoPixelRainbow(
         PIXEL_PIN,
         NUM_PIXELS,
@@ -347,8 +350,15 @@ def main():
         steps=NUM_COLORS,
         saturation=1.0,
         hue_fn=lambda x: locked_sigmoid(x, SIGMOID_A, SIGMOID_B),
+        gamma=GAMMA,
+        rotate=ROTATE,
+        low_memory=LOW_MEMORY,
+        table_cache=table_cache,
+        hue_key=("locked_sigmoid", SIGMOID_A, SIGMOID_B),
         auto_write=False,
     )
+    if RECORD_PATH is not None:
+        Recorder(pixels, open(RECORD_PATH, "wb"), max_frames=RECORD_FRAMES)
 
     pot1 = analogio.AnalogIn(POT1_PIN)
     pot2 = analogio.AnalogIn(POT2_PIN)
@@ -360,6 +370,7 @@ def main():
         callback=lambda value: setattr(pixels, "speed", value),
         profile="symmetric_cubic",
         name="Speed",
+        low_memory=LOW_MEMORY,
     )
     pot_color_delta = Potentiometer(
         pot2,
@@ -368,6 +379,7 @@ def main():
         callback=lambda value: setattr(pixels, "color_delta", value),
         profile="symmetric_cubic",
         name="Color Delta",
+        low_memory=LOW_MEMORY,
     )
     pot_hue_lower = Potentiometer(
         pot1,
@@ -380,6 +392,7 @@ def main():
         ),
         profile="linear",
         name="Hue Lower",
+        low_memory=LOW_MEMORY,
     )
     pot_hue_delta = Potentiometer(
         pot2,
@@ -390,6 +403,7 @@ def main():
         ),
         profile="linear",
         name="Hue Delta",
+        low_memory=LOW_MEMORY,
     )
     pot_sat = Potentiometer(
         pot1,
@@ -398,6 +412,7 @@ def main():
         callback=lambda value: setattr(pixels, "saturation", value),
         profile="linear",
         name="Saturation",
+        low_memory=LOW_MEMORY,
     )
     pot_bright = Potentiometer(
         pot2,
@@ -406,6 +421,7 @@ def main():
         callback=lambda value: setattr(pixels, "brightness", value),
         profile="quadratic",
         name="Brightness",
+        low_memory=LOW_MEMORY,
     )
     pot_sequence = PotSequence(
         [
@@ -415,6 +431,8 @@ def main():
         ],
         pixels=pixels,
         indicator_timeout=5,
+        table_cache=table_cache,
+        low_memory=LOW_MEMORY,
     )
 
     btn1 = ClickButton(
@@ -432,14 +450,28 @@ def main():
         release_callback=lambda: pot_sequence.next(),
     )
 
+    def render(dt):
+        pixels.update(dt)
+        pot_sequence.draw()
+        pixels.show()
+
+    buttons = Buttons([btn1, btn2])
+
     # Mainloop
-    while True:
-        btn1.update()
-        btn2.update()
+    scheduler = Scheduler(collect_idle=GC_IDLE, collect_after=GC_AFTER)
+    scheduler.every(1 / FRAME_RATE, render, name="Frames")
+    scheduler.every(1 / BUTTONS_RATE, lambda dt: buttons.update(), name="Buttons")
+    scheduler.every(1 / POTS_RATE, lambda dt: pot_sequence.poll(), name="Pots")
+    if REPORT_PERIOD:
+        scheduler.every(REPORT_PERIOD, lambda dt: print(scheduler), name="Report")
+    if MEMORY_REPORT:
+        # Renders a frame first, tables are built by the first one
         pixels.update()
-        for i in range(5):
-            pot_sequence.update()
-        pixels.show()
+        memory_report(
+            [("Strip", pixels), ("Pot sequence", pot_sequence)]
+            + [("Pot " + pot.name, pot) for pot in pot_sequence.all_pots]
+        )
+    scheduler.run()
 
 
 def test():
@@ -0,0 +1,125 @@
+"""
+Potentiometer response curves
+"""
+from array import array
+
+FULL_SCALE = 65535
+
+
+def _clamp(x):
+    if x < 0:
+        return 0
+    elif x > 1:
+        return 1
+    return x
+
+
+class Curve:
+    """
+    Response of a potentiometer, compiled into integer tables of
+    `1 << bits` entries indexed by the top `bits` bits of a 16 bit ADC
+    reading, so reading it takes no float math.
+
+    `fn` maps the knob position in [0, 1] to a response in [0, 1].
+    `inverse`, when given, maps a response back to a position; otherwise
+    positions are searched in the table, which must then be increasing.
+    """
+
+    def __init__(self, fn, inverse=None, bits=10):
+        self.fn = fn
+        self.inverse = inverse
+        self.bits = bits
+        self.shift = 16 - bits
+        self._tables = {}
+
+    def table(self, low, high, bits=None):
+        """
+        Returns the table for readings spanning from `low` to `high`, with
+        responses scaled to `FULL_SCALE`. Tables are cached, so pots
+        sharing a curve and span share a table. `bits` overrides the
+        curve `bits`, to trade resolution for memory.
+        """
+        if bits is None:
+            bits = self.bits
+        key = (low, high, bits)
+        table = self._tables.get(key)
+        if table is None:
+            size = 1 << bits
+            shift = 16 - bits
+            half = (1 << shift) >> 1
+            table = array("H", [0] * size)
+            for i in range(size):
+                x = _clamp(((i << shift) + half - low) / (high - low))
+                table[i] = int(FULL_SCALE * _clamp(self.fn(x)) + 0.5)
+            self._tables[key] = table
+        return table
+
+    def reading(self, response, low, high):
+        """
+        Returns the raw reading, from `low` to `high`, whose response is
+        `response`.
+        """
+        response = _clamp(response)
+        if self.inverse is not None:
+            return int(self.inverse(response) * (high - low) + low + 0.5)
+        table = self.table(low, high)
+        target = response * FULL_SCALE
+        a = 0
+        b = len(table) - 1
+        while a < b:
+            m = (a + b) // 2
+            if table[m] < target:
+                a = m + 1
+            else:
+                b = m
+        reading = (a << self.shift) + ((1 << self.shift) >> 1)
+        return min(max(reading, low), high)
+
+
+def power(k):
+    """
+    Curve `x ** k`
+    """
+    return Curve(lambda x: x ** k, lambda y: y ** (1 / k))
+
+
+def symmetric(k):
+    """
+    Curve `((2x - 1) ** k + 1) / 2` for an odd `k`: flat around the
+    middle and steep at the ends.
+    """
+
+    def inverse(y):
+        y = 2 * y - 1
+        if y < 0:
+            return (1 - (-y) ** (1 / k)) / 2
+        return (y ** (1 / k) + 1) / 2
+
+    return Curve(lambda x: (((2 * x) - 1) ** k + 1) / 2, inverse)
+
+
+def piecewise(points, bits=10):
+    """
+    Curve through the `(position, response)` control points, joined by
+    straight lines. `points` are sorted by position.
+    """
+
+    def fn(x):
+        x0, y0 = points[0]
+        if x <= x0:
+            return y0
+        for x1, y1 in points[1:]:
+            if x <= x1:
+                return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+            x0, y0 = x1, y1
+        return y0
+
+    return Curve(fn, bits=bits)
+
+
+LINEAR = power(1)
+QUADRATIC = power(2)
+CUBIC = power(3)
+SYMMETRIC_CUBIC = symmetric(3)
+SYMMETRIC_FIFTH = symmetric(5)
+SYMMETRIC_SEVENTH = symmetric(7)
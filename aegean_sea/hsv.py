@@ -0,0 +1,75 @@
+"""
+Integer HSV to RGB conversion
+"""
+
+HUE_STEPS = 65536  # Hues in a full turn of the color wheel
+# Fraction of a hue sextant, 12 bits so products stay in small ints
+_FRACTION = 4096
+_SCALE = 255 * _FRACTION
+
+
+def hue(x):
+    """
+    Integer hue of `x` in turns, like the `h` of `colorsys`
+    """
+    return int(x * HUE_STEPS) % HUE_STEPS
+
+
+def hsv_to_rgb(h, s=255, v=255):
+    """
+    Converts the integer hue `h` (0 to 65535), saturation `s` and value
+    `v` (0 to 255) to an `(r, g, b)` tuple of 0 to 255 channels, within
+    one unit of `colorsys` with no floating point math.
+    """
+    h6 = h * 6
+    i = h6 >> 16
+    f = (h6 & 0xFFFF) >> 4
+    p = (v * (255 - s) + 127) // 255
+    q = (v * (_SCALE - s * f) + _SCALE // 2) // _SCALE
+    t = (v * (_SCALE - s * (_FRACTION - f)) + _SCALE // 2) // _SCALE
+    if i == 0:
+        return v, t, p
+    if i == 1:
+        return q, v, p
+    if i == 2:
+        return p, v, t
+    if i == 3:
+        return p, q, v
+    if i == 4:
+        return t, p, v
+    return v, p, q
+
+
+def fill_hsv(buffer, hues, s=255, v=255, order=(0, 1, 2)):
+    """
+    Writes the colors of the integer `hues` at saturation `s` and value
+    `v` into `buffer`, an `array("B")` or `bytearray` of 3 bytes per
+    hue, with the red, green and blue bytes at the positions in `order`.
+    """
+    r, g, b = order
+    p = (v * (255 - s) + 127) // 255
+    half = _SCALE // 2
+    j = 0
+    for h in hues:
+        h6 = h * 6
+        i = h6 >> 16
+        f = (h6 & 0xFFFF) >> 4
+        if i & 1:
+            # Falling sextants
+            x = (v * (_SCALE - s * f) + half) // _SCALE
+        else:
+            x = (v * (_SCALE - s * (_FRACTION - f)) + half) // _SCALE
+        if i == 0:
+            buffer[j + r], buffer[j + g], buffer[j + b] = v, x, p
+        elif i == 1:
+            buffer[j + r], buffer[j + g], buffer[j + b] = x, v, p
+        elif i == 2:
+            buffer[j + r], buffer[j + g], buffer[j + b] = p, v, x
+        elif i == 3:
+            buffer[j + r], buffer[j + g], buffer[j + b] = p, x, v
+        elif i == 4:
+            buffer[j + r], buffer[j + g], buffer[j + b] = x, p, v
+        else:
+            buffer[j + r], buffer[j + g], buffer[j + b] = v, p, x
+        j += 3
+    return buffer
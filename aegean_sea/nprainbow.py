@@ -4,18 +4,63 @@ NeoPixel rainbow library
 from array import array
 import math
 
+try:
+    from io import BytesIO
+except ImportError:
+    BytesIO = None
+
 from neopixel import NeoPixel
+from hsv import fill_hsv, hue
+from npblit import blit, brightness_table, pixel_order, to_pixel_order
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
 
 
 class NeoPixelRainbow(NeoPixel):
     """
     Neopixel rainbow effect.
 
+    `brightness` and the `gamma` correction are baked into
+    `color_table`, so the driver always runs at full brightness and
+    frames are plain byte copies.
+
+    With `ulab` (or NumPy on a computer) frames are rendered with whole
+    array operations instead of a loop over the pixels.
+
+    Frames are only rendered when the hue moved or a setting changed,
+    and `show` only sends them when they did.
+
+    With `rotate`, a looping rainbow is rendered once into a ring of
+    pixels holding one hue period, and each frame is a rotation of it,
+    read from the ring as a stream into the frame. The hue then moves
+    along the strip by whole pixels.
+
+    With a `tablecache.TableCache` as `table_cache`, the color table is
+    read from flash instead of built, when `hue_key` names `hue_fn` and
+    its parameters.
+
+    `low_memory` is for boards with little RAM, like the SAMD21 ones: the
+    color tables are capped to `low_memory_steps`, frames are rendered
+    straight into the strip buffer, and neither `rotate` nor `ulab` are
+    used. `memory` lists the buffers, for `memory.memory_report`.
+
+    `update` and `show` allocate nothing once the tables are built,
+    unless frames are rendered with `ulab`.
+
     Please check https://github.com/luxedo/gin_tonic/tree/main/aegean_sea
     for demo and examples.
     """
 
     sat_levels = 20
+    frame_rate = 50  # Frames per second `speed` is tuned for
+    max_ring = 1024  # Pixels in the `rotate` ring
+    low_memory_steps = 64  # Color table steps with `low_memory`
 
     def __init__(
         self,
@@ -27,10 +72,36 @@ class NeoPixelRainbow(NeoPixel):
         steps,
         saturation,
         hue_fn=lambda x: x,
+        gamma=1.0,
+        rotate=False,
+        table_cache=None,
+        hue_key=None,
+        low_memory=False,
         **kwargs
     ):
-        super().__init__(*args, **kwargs)
+        brightness = kwargs.pop("brightness", 1.0)
+        # Before the strip, which may already call `show`
+        self.dirty = True
+        self._rendered = None
+        super().__init__(*args, brightness=1.0, **kwargs)
+        self.low_memory = low_memory
+        post = getattr(self, "_post_brightness_buffer", None)
+        if low_memory and post is not None and self._pixel_step == 3:
+            # Already at full brightness, no scaled copy to keep
+            self._frame = memoryview(post)[self._offset : self._offset + 3 * len(self)]
+        else:
+            self._frame = bytearray(3 * len(self))
+        self._ramp = None
+        self._vector = np is not None and not low_memory
+        self._period_colors = None
+        self._ring = None
+        self.rotate = rotate
+        self._sat_idx = self.sat_levels
+        self.brightness = brightness
+        self.gamma = gamma
         self.hue_fn = hue_fn
+        self.table_cache = table_cache
+        self.hue_key = hue_key
         self.color_delta = color_delta
         self.initial_hue = initial_hue
         self.steps = steps
@@ -43,6 +114,93 @@ class NeoPixelRainbow(NeoPixel):
             self[i] = (0, 0, 0)
         self.show()
 
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        # Drawn over the frame, render it again on the next update
+        self._rendered = None
+        self.dirty = True
+
+    def fill(self, color):
+        super().fill(color)
+        self._rendered = None
+        self.dirty = True
+
+    def show(self):
+        """
+        Sends the frame, unless it did not change since the last call
+        """
+        if self.dirty:
+            self.dirty = False
+            super().show()
+
+    @property
+    def rotate(self):
+        return self._rotate
+
+    @rotate.setter
+    def rotate(self, value):
+        self._rotate = value
+        self._ring_dirty = True
+        self._rendered = None
+
+    @property
+    def color_delta(self):
+        return self._color_delta
+
+    @color_delta.setter
+    def color_delta(self, value):
+        self._color_delta = value
+        self._ramp = None
+
+    @property
+    def brightness(self):
+        return self._level
+
+    @brightness.setter
+    def brightness(self, value):
+        self._level = min(max(value, 0.0), 1.0)
+        self._table_dirty = True
+
+    @property
+    def gamma(self):
+        return self._gamma
+
+    @gamma.setter
+    def gamma(self, value):
+        self._gamma = value
+        self._table_dirty = True
+
+    @property
+    def lut(self):
+        """
+        Brightness and gamma lookup table baked into `color_table`.
+        """
+        return brightness_table(self._level, self._gamma)
+
+    @property
+    def color_table(self):
+        """
+        Color table for the current saturation with `lut` applied. It is
+        rebuilt lazily after brightness, gamma, saturation or steps change.
+
+        With `v = 1`, HSV channels are linear in saturation, so each level
+        is the fully saturated table blended toward white.
+        """
+        if self._table_dirty:
+            lut = self.lut
+            full = self.full_color_table
+            level = self._sat_idx
+            levels = self.sat_levels
+            table = self._table
+            for j in range(len(table)):
+                white = ((255 - full[j]) * level + levels - 1) // levels
+                table[j] = lut[255 - white]
+            self._table_dirty = False
+            self._period_colors = None
+            self._ring_dirty = True
+            self._rendered = None
+        return self._table
+
     @property
     def initial_hue(self):
         return self._initial_hue
@@ -57,12 +215,45 @@ class NeoPixelRainbow(NeoPixel):
 
     @steps.setter
     def steps(self, value):
+        if self.low_memory:
+            value = min(value, self.low_memory_steps)
         self._steps = value
-        self.color_tables = [
-            self.create_color_table(self._steps, i / self.sat_levels, self.hue_fn)
-            for i in range(self.sat_levels + 1)
-        ]
-        self.color_table = self.color_tables[-1]
+        self._ramp = None
+        # Lower saturations are blended toward white when baking
+        if self.table_cache is None or self.hue_key is None:
+            self.full_color_table = self._build_full_color_table()
+        else:
+            self.full_color_table = self.table_cache.load(
+                ("rainbow", self._steps, self.hue_key, pixel_order(self)),
+                3 * self._steps,
+                self._build_full_color_table,
+            )
+        self._table = bytearray(3 * self._steps)
+        self._table_dirty = True
+
+    def memory(self):
+        """
+        Buffers held by the strip, by name
+        """
+        return {
+            "strip": getattr(self, "_post_brightness_buffer", None),
+            "strip_pre_brightness": getattr(self, "_pre_brightness_buffer", None),
+            # A view of the strip buffer with `low_memory`
+            "frame": None if isinstance(self._frame, memoryview) else self._frame,
+            "full_color_table": self.full_color_table,
+            "color_table": self._table,
+            "ramp": self._ramp,
+            "period_index": getattr(self, "_period_index", None),
+            # A copy of the ring, as streams have no length
+            "ring": None if self._ring is None else self._ring.getvalue(),
+            "period_colors": self._period_colors,
+            "np_ramp": getattr(self, "_np_ramp", None),
+        }
+
+    def _build_full_color_table(self):
+        return to_pixel_order(
+            self, self.create_color_table(self._steps, 1.0, self.hue_fn)
+        )
 
     @property
     def saturation(self):
@@ -71,7 +262,8 @@ class NeoPixelRainbow(NeoPixel):
     @saturation.setter
     def saturation(self, value):
         self._saturation = value
-        self.color_table = self.color_tables[round(value * self.sat_levels)]
+        self._sat_idx = round(value * self.sat_levels)
+        self._table_dirty = True
 
     @property
     def speed(self):
@@ -96,50 +288,162 @@ class NeoPixelRainbow(NeoPixel):
         self._hue_steps = round(value[1] * self.steps)
         self._hue_steps = 1 if self._hue_steps <= 0 else self._hue_steps
         self._hue_loop = self._hue_steps > 0.99 * self.steps
+        self._ramp = None
 
-    def update(self):
+    def _build_ramp(self):
         """
-        Please 🙏 call me at each tick to update the LEDs
+        Caches the per pixel hue offsets. `_ramp` holds the offset of
+        each pixel already wrapped to the hue period and `_period_index`
+        maps a position in the period to a color table index.
         """
-        color_steps_delta = self._hue_steps * self.color_delta / len(self)
+        steps = self.steps
         if self._hue_loop:
-            color_indices = [
-                round((self._hue_lower + self.base_idx + i * color_steps_delta))
-                % self.steps
-                for i in range(len(self))
-            ]
+            period = steps
+            self._period_index = array(
+                "H", [(self._hue_lower + k) % steps for k in range(period)]
+            )
         else:
-            color_indices = []
-            for i in range(len(self)):
-                index = round(self.base_idx + i * color_steps_delta) % (
-                    2 * self._hue_steps
-                )
-                if index > self._hue_steps:
-                    index = self._hue_steps - (index % self._hue_steps)
-                index = (self._hue_lower + index) % self.steps
-                color_indices.append(index)
-
-        for i, color in enumerate(color_indices):
-            self[i] = list(self.color_table[3 * color : 3 * (color + 1)])
-
-        self.speed_acc += self._normalized_speed
+            hue_steps = self._hue_steps
+            period = 2 * hue_steps
+            self._period_index = array(
+                "H",
+                [
+                    (self._hue_lower + (k if k <= hue_steps else period - k)) % steps
+                    for k in range(period)
+                ],
+            )
+        color_steps_delta = self._hue_steps * self.color_delta / len(self)
+        self._period = period
+        self._rendered = None
+        self._ring_dirty = True
+        self._ramp = array(
+            "H", [round(i * color_steps_delta) % period for i in range(len(self))]
+        )
+        if self._vector:
+            self._np_ramp = np.array(self._ramp, dtype=np.uint16)
+            self._period_colors = None
+
+    def _build_ring(self):
+        """
+        Renders one hue period along the strip into `_ring`, for `rotate`,
+        followed by its first pixels again so any rotation of the strip
+        length can be read in one go. Frames are only rotations of it
+        when the hue loops and moves at most one step per pixel,
+        otherwise `_ring` is left None. So is it when the period spans
+        more than `max_ring` pixels.
+        """
+        table = self.color_table
+        self._ring = None
+        self._ring_dirty = False
+        if not (self._rotate and self._hue_loop) or self.low_memory:
+            return
+        if BytesIO is None:
+            return
+        delta = self._hue_steps * self.color_delta / len(self)
+        if delta == 0 or abs(delta) > 1:
+            return
+        period = self._period
+        size = round(period / abs(delta))
+        if size > self.max_ring:
+            return
+        self._ring_sign = 1 if delta > 0 else -1
+        period_index = self._period_index
+        ring = bytearray(3 * (size + len(self) - 1))
+        for p in range(size + len(self) - 1):
+            k = self._ring_sign * ((2 * (p % size) * period + size) // (2 * size))
+            t = 3 * period_index[k % period]
+            ring[3 * p : 3 * p + 3] = table[t : t + 3]
+        self._ring_size = size
+        # Seeking a stream and reading it into the frame copies at any
+        # offset without a slice of the ring
+        self._ring = BytesIO(ring)
+
+    def _build_period_colors(self):
+        """
+        Caches the colors of two hue periods in a row as a `(2 * period,
+        3)` array, so a frame is a single `take` at `base + ramp`.
+        """
+        table = self.color_table
+        colors = np.array(table, dtype=np.uint8).reshape((len(table) // 3, 3))
+        index = np.array(self._period_index, dtype=np.uint16)
+        self._period_colors = np.take(colors, np.concatenate((index, index)), axis=0)
+
+    def update(self, dt=None):
+        """
+        Please 🙏 call me at each tick to update the LEDs
+
+        With `dt`, the seconds since the previous call, the animation
+        moves with time instead of frames, at the same speed as
+        `frame_rate` frames per second.
+        """
+        if self._ramp is None:
+            self._build_ramp()
+        if self._table_dirty or self._ring_dirty:
+            self._build_ring()
+        base = self.base_idx % self._period
+        ring = self._ring
+        if ring is not None:
+            # Pixel of the ring at the start of the strip
+            size = self._ring_size
+            period = self._period
+            base = self._ring_sign * ((2 * base * size + period) // (2 * period))
+            base %= size
+        if base != self._rendered:
+            if ring is not None:
+                ring.seek(3 * base)
+                ring.readinto(self._frame)
+                blit(self, self._frame)
+            elif self._vector:
+                self._render_vector(base)
+            else:
+                self._render(base)
+            # After the blit: on core PixelBuf it goes through __setitem__,
+            # which forgets the rendered frame
+            self._rendered = base
+            self.dirty = True
+
+        if dt is None:
+            self.speed_acc += self._normalized_speed
+        else:
+            self.speed_acc += self._normalized_speed * dt * self.frame_rate
         if self.speed_acc >= 1:
             self.base_idx += int(self.speed_acc)
             self.base_idx %= 2 * self._hue_steps
             self.speed_acc = 0
 
+    def _render(self, base):
+        ramp = self._ramp
+        period_index = self._period_index
+        period = self._period
+        table = self.color_table
+        frame = self._frame
+        j = 0
+        for i in range(len(frame) // 3):
+            k = base + ramp[i]
+            if k >= period:
+                k -= period
+            t = 3 * period_index[k]
+            frame[j] = table[t]
+            frame[j + 1] = table[t + 1]
+            frame[j + 2] = table[t + 2]
+            j += 3
+        blit(self, frame)
+
+    def _render_vector(self, base):
+        if self._table_dirty or self._period_colors is None:
+            self._build_period_colors()
+        frame = np.take(self._period_colors, self._np_ramp + base, axis=0)
+        blit(self, frame.tobytes())
+
     @staticmethod
     def create_color_table(steps, saturation=1, hue_fn=lambda x: x):
         """
         Builds the color table with n `steps`. Hue can be biased with
         `hue_fn`. Defaults to a linear function when omitted.
         """
-        table = array("B", [])
-        for i in range(steps):
-            hue = hue_fn(i / steps)
-            for c in NeoPixelRainbow.hsv_to_rgb(hue, saturation, 1.0):
-                table.append(int(255 * c))
-        return table
+        hues = array("H", [hue(hue_fn(i / steps)) for i in range(steps)])
+        table = array("B", bytes(3 * steps))
+        return fill_hsv(table, hues, round(255 * saturation))
 
     @staticmethod
     def sigmoid(x):
@@ -0,0 +1,178 @@
+"""
+Frame recorder
+"""
+import struct
+import time
+
+try:
+    from time import monotonic_ns
+except ImportError:
+    monotonic_ns = None
+
+MAGIC = b"GTFR"
+VERSION = 1
+# Magic, version, bytes per pixel, pixels and the red, green and blue
+# byte positions in each pixel
+HEADER = "<4sBBHBBB"
+# Microseconds since the previous frame and payload bytes
+FRAME = "<IH"
+# Offset and length of a run of changed bytes, followed by the bytes
+RUN = "<HH"
+# Unchanged bytes merged into a run rather than starting a new one
+_GAP = struct.calcsize(RUN)
+
+
+def _now_us():
+    if monotonic_ns is not None:
+        return monotonic_ns() // 1000
+    return int(time.monotonic() * 1000000)
+
+
+class Recorder:
+    """
+    Records every frame shown by `pixels` into `stream`, a file opened
+    with `"wb"`. `show` is wrapped, so effects need no change. Strips
+    with a `dirty` flag, which skip `show` for unchanged frames, are
+    only recorded when they send one.
+
+    The file starts with a `HEADER`. Each frame follows as a `FRAME`
+    with the time since the previous one, then the runs of bytes that
+    changed since it, each a `RUN` and the new bytes. Unchanged frames
+    take 6 bytes. Use `frames` to read a recording back.
+
+    Bytes are the ones sent to the strip, after brightness, when the
+    strip is a python PixelBuf. Otherwise the pixel colors are recorded,
+    in RGB(W) order.
+
+    Recording costs a loop over the frame bytes on each `show`. Writing
+    to CIRCUITPY needs `storage.remount("/", readonly=False)` in
+    `boot.py`. `stream` is flushed every `flush_every` frames and
+    recording stops after `max_frames`.
+    """
+
+    def __init__(self, pixels, stream, max_frames=None, flush_every=50):
+        self.pixels = pixels
+        self.stream = stream
+        self.max_frames = max_frames
+        self.flush_every = flush_every
+        self.frames = 0
+        buffer = getattr(pixels, "_post_brightness_buffer", None)
+        if buffer is not None:
+            step = pixels._pixel_step
+            order = pixels._byteorder
+            self._view = memoryview(buffer)[
+                pixels._offset : pixels._offset + step * len(pixels)
+            ]
+        else:
+            step = len(pixels[0])
+            order = (0, 1, 2)
+            self._view = None
+        size = step * len(pixels)
+        self._frame = bytearray(size)
+        self._previous = bytearray(size)
+        # Worst case: a run for every changed byte followed by a gap
+        self._payload = bytearray(size + _GAP * (size // (_GAP + 1) + 1))
+        self._last = None
+        stream.write(struct.pack(HEADER, MAGIC, VERSION, step, len(pixels), *order[:3]))
+        self._show = pixels.show
+        pixels.show = self.show
+
+    def show(self):
+        sends = getattr(self.pixels, "dirty", True)
+        self._show()
+        if sends and (self.max_frames is None or self.frames < self.max_frames):
+            self.capture()
+
+    def capture(self):
+        """
+        Records the current frame of `pixels`
+        """
+        now = _now_us()
+        interval = 0 if self._last is None else min(now - self._last, 0xFFFFFFFF)
+        self._last = now
+        frame = self._frame
+        if self._view is not None:
+            frame[:] = self._view
+        else:
+            step = len(frame) // len(self.pixels)
+            for i in range(len(self.pixels)):
+                color = self.pixels[i]
+                for c in range(step):
+                    frame[step * i + c] = color[c]
+        previous = self._previous
+        payload = self._payload
+        size = len(frame)
+        m = 0
+        i = 0
+        while i < size:
+            if frame[i] == previous[i]:
+                i += 1
+                continue
+            start = i
+            end = i + 1
+            i += 1
+            while i < size and i - end < _GAP:
+                if frame[i] != previous[i]:
+                    end = i + 1
+                i += 1
+            struct.pack_into(RUN, payload, m, start, end - start)
+            m += _GAP
+            payload[m : m + end - start] = frame[start:end]
+            m += end - start
+        self.stream.write(struct.pack(FRAME, interval, m))
+        self.stream.write(memoryview(payload)[:m])
+        self._frame = previous
+        self._previous = frame
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self.stream.flush()
+
+    def close(self):
+        """
+        Stops recording and restores `pixels.show`
+        """
+        self.pixels.show = self._show
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_header(stream):
+    """
+    Returns `(bytes per pixel, pixels, (r, g, b))` from a recording
+    """
+    data = stream.read(struct.calcsize(HEADER))
+    magic, version, step, n, r, g, b = struct.unpack(HEADER, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a frame recording")
+    return step, n, (r, g, b)
+
+
+def frames(stream, size):
+    """
+    Yields `(microseconds since the start, frame bytes)` for each frame
+    of a recording, after its header was read with `read_header`.
+    `size` is the bytes per pixel times the pixels. The frame bytearray
+    is reused, copy it to keep it.
+    """
+    frame = bytearray(size)
+    now = 0
+    frame_size = struct.calcsize(FRAME)
+    while True:
+        data = stream.read(frame_size)
+        if len(data) < frame_size:
+            return
+        interval, length = struct.unpack(FRAME, data)
+        payload = stream.read(length)
+        m = 0
+        while m < length:
+            start, run = struct.unpack_from(RUN, payload, m)
+            m += _GAP
+            frame[start : start + run] = payload[m : m + run]
+            m += run
+        now += interval
+        yield now, frame
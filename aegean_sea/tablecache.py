@@ -0,0 +1,62 @@
+"""
+Color table cache in flash
+"""
+import os
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+VERSION = 1  # Bump when the tables are built differently
+
+
+class TableCache:
+    """
+    Keeps the tables built at boot as files in `folder`, named after a
+    hash of the parameters they are built from, so the next boots read
+    them back instead.
+
+    CircuitPython only lets code write to CIRCUITPY after
+    `storage.remount("/", readonly=False)` in `boot.py`. Otherwise the
+    tables are built at each boot, as without a cache. Copying the
+    folder of a simulator run to the board fills it too.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, key):
+        return "{}/{:08x}.bin".format(
+            self.folder, crc32(repr((VERSION, key)).encode()) & 0xFFFFFFFF
+        )
+
+    def load(self, key, size, build):
+        """
+        Returns the `size` bytes table for `key`, read from flash, or
+        built with `build()` and saved when missing.
+        """
+        if crc32 is None:
+            return build()
+        path = self.path(key)
+        table = bytearray(size)
+        try:
+            with open(path, "rb") as file:
+                if file.readinto(table) == size and not file.read(1):
+                    return table
+        except OSError:
+            pass
+        table = build()
+        self.save(path, table)
+        return table
+
+    def save(self, path, table):
+        try:
+            try:
+                os.mkdir(self.folder)
+            except OSError:
+                pass  # Already there
+            with open(path, "wb") as file:
+                file.write(table)
+        except OSError:
+            pass  # Read only filesystem
@@ -0,0 +1,159 @@
+"""
+Event driven buttons
+"""
+import time
+import digitalio
+
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & _TICKS_MAX
+
+
+def ticks_diff(end, start):
+    """
+    Milliseconds from `start` to `end`, two `ticks_ms` that may have
+    wrapped around.
+    """
+    return ((end - start + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+class ClickButton:
+    """
+    Calls `press_callback` when the button is pressed and
+    `release_callback` when it is released, or `hold_callback` instead
+    when it was held longer than `hold_callback_timeout` seconds.
+
+    The button is read by a `Buttons` scanner, which feeds it timestamped
+    `press` and `release` events.
+    """
+
+    def __init__(
+        self,
+        pin,
+        press_callback=lambda: None,
+        release_callback=lambda: None,
+        hold_callback=lambda: None,
+        hold_callback_timeout=1,
+    ):
+        self.pin = pin
+        self.press_callback = press_callback
+        self.release_callback = release_callback
+        self.hold_callback = hold_callback
+        self.hold_callback_timeout = hold_callback_timeout
+        self.skip_release = False
+        self.holding = False
+        self.holding_tick = 0
+
+    def press(self, timestamp):
+        self.press_callback()
+        self.holding = True
+        self.holding_tick = timestamp
+
+    def release(self, timestamp):
+        # A hold that ended between two scans is still a hold
+        self.hold(timestamp)
+        if self.skip_release:
+            self.skip_release = False
+            return
+        self.release_callback()
+        self.holding = False
+
+    def hold(self, now):
+        """
+        Calls `hold_callback` if the button is held since long enough
+        at `now`, a `ticks_ms` timestamp.
+        """
+        if (
+            self.holding
+            and ticks_diff(now, self.holding_tick) > self.hold_callback_timeout * 1000
+        ):
+            self.hold_callback()
+            self.holding = False
+            self.skip_release = True
+
+
+class Buttons:
+    """
+    Reads `buttons`, a list of `ClickButton`, with a `keypad.Keys` event
+    queue. keypad debounces and timestamps the presses in the background,
+    so `update` costs nothing while no button is touched and never misses
+    a short press between two slow frames. When `keypad` is not available
+    the pins are polled with `digitalio` on `update`.
+
+    `value_when_pressed` and `pull` are passed on to `keypad.Keys`.
+    """
+
+    def __init__(self, buttons, value_when_pressed=True, pull=True, interval=0.02):
+        self.buttons = buttons
+        if keypad is not None:
+            self.keys = keypad.Keys(
+                [button.pin for button in buttons],
+                value_when_pressed=value_when_pressed,
+                pull=pull,
+                interval=interval,
+            )
+            self._event = keypad.Event()
+        else:
+            self.keys = None
+            self.value_when_pressed = value_when_pressed
+            self._inputs = []
+            for button in buttons:
+                digital_in = digitalio.DigitalInOut(button.pin)
+                digital_in.direction = digitalio.Direction.INPUT
+                if pull:
+                    digital_in.pull = (
+                        digitalio.Pull.DOWN if value_when_pressed else digitalio.Pull.UP
+                    )
+                self._inputs.append(digital_in)
+            self._pressed = bytearray(len(buttons))
+
+    def update(self):
+        """
+        Dispatches the pending events and the holds. Returns True if a
+        button was pressed or released.
+        """
+        changed = False
+        if self.keys is not None:
+            event = self._event
+            while self.keys.events.get_into(event):
+                self._dispatch(event.key_number, event.pressed, event.timestamp)
+                changed = True
+        else:
+            for i in range(len(self._inputs)):
+                pressed = self._inputs[i].value == self.value_when_pressed
+                if pressed != self._pressed[i]:
+                    self._pressed[i] = pressed
+                    self._dispatch(i, pressed, ticks_ms())
+                    changed = True
+        now = None
+        for button in self.buttons:
+            if button.holding:
+                if now is None:
+                    now = ticks_ms()
+                button.hold(now)
+        return changed
+
+    def _dispatch(self, key_number, pressed, timestamp):
+        if pressed:
+            self.buttons[key_number].press(timestamp)
+        else:
+            self.buttons[key_number].release(timestamp)
+
+    def deinit(self):
+        if self.keys is not None:
+            self.keys.deinit()
+        else:
+            for digital_in in self._inputs:
+                digital_in.deinit()
@@ -1,10 +1,21 @@
-"""CircuitPython Essentials NeoPixel example"""
+"""
+CircuitPython Essentials NeoPixel example, for the Circuit Playground
+Bluefruit
+"""
+from array import array
 import random
 import time
+import audiobusio
 import board
 from micropython import const
 import npfirefly
 from adafruit_circuitplayground import cp
+from buttons import Buttons, ClickButton
+from memory import memory_report
+from sampler import Sampler
+from recorder import Recorder
+from scheduler import Scheduler
+from spectrum import BandAnalyzer
 
 
 # NeoPixels configuration
@@ -15,45 +26,65 @@ BRIGHTNESS_INITIAL_IDX = 3
 MIN_STEPS = 4  # Minimum firefly flicker timesteps
 MAX_STEPS = 16  # Maximum firefly flicker timesteps
 MAX_COLOR_DELTA = 200  # Maximum color difference
+FRAME_RATE = 60  # Frames per second
+BUTTONS_RATE = 50  # Buttons readings per second
+SOUND_RATE = 20  # Audio blocks per second
 
 # Microphone levels
+SOUND_BLOCK = 256  # Samples per audio block
+SOUND_SAMPLE_RATE = 16000  # Microphone samples per second
 LEVEL_OFSET = 50
 LEVEL_SENSIBILITY = 1 / 20
-DEBOUNCE_TIMEOUT = 0.2
+BEAT_FIREFLIES = 8  # Extra fireflies on each beat
+
+# Smaller buffers for boards with little RAM, like the SAMD21 ones
+LOW_MEMORY = False
+MEMORY_REPORT = False  # Print the bytes held by each component at boot
+
+# Garbage collection between frames rather than in the middle of one
+GC_IDLE = None  # Idle seconds needed to collect, like 0.005. None disables it
+GC_AFTER = 4096  # Bytes allocated before collecting again
+
+# Frame recording, see recorder.py. Writing to CIRCUITPY needs boot.py
+RECORD_PATH = None  # File the frames are recorded to, like "/frames.bin"
+RECORD_FRAMES = 3000  # Frames recorded at most
+
+# Light sensor
+LIGHT_SAMPLES = 100  # Samples of each color
+LIGHT_SAMPLE_RATE = 10000  # Light samples per second
 
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
 
-def sample_countdown():
-    for i in range(len(cp.pixels)):
-        cp.pixels[i] = (0, 0, 0)
+def sample_countdown(buttons):
+    # The fireflies canvas drives `cp.pixels` with `auto_write` off
+    cp.pixels.fill((0, 0, 0))
     for i in range(len(cp.pixels)):
         cp.pixels[i] = (127, 127, 127)
+        cp.pixels.show()
         now = time.monotonic()
         while time.monotonic() < now + 1:
-            if cp.button_a or cp.button_b:
+            if buttons.update():
                 return
+            time.sleep(1 / BUTTONS_RATE)
 
 
-def sample_color(samples, color):
-    for i in range(len(cp.pixels)):
-        cp.pixels[i] = color
-    acc = 0
-    for _ in range(samples):
-        acc += cp.light
-    for i in range(len(cp.pixels)):
-        cp.pixels[i] = (0, 0, 0)
-    return acc / samples
+def sample_color(light, color):
+    cp.pixels.fill(color)
+    cp.pixels.show()
+    mean = light.read()
+    cp.pixels.fill((0, 0, 0))
+    cp.pixels.show()
+    return mean
 
 
-def sample_colors():
-    sample_countdown()
-    samples = 100
-    red = sample_color(samples, RED)
-    green = sample_color(samples, GREEN)
-    blue = sample_color(samples, BLUE)
+def sample_colors(buttons, light):
+    sample_countdown(buttons)
+    red = sample_color(light, RED)
+    green = sample_color(light, GREEN)
+    blue = sample_color(light, BLUE)
     lowest = min([red, green, blue])
     highest = max([red, green, blue])
     delta = highest - lowest
@@ -79,6 +110,14 @@ def bound_color(color):
     return 0 if color < 0 else 255 if color > 255 else color
 
 
+def tint(color_range, share):
+    """
+    Raises the top of `color_range` towards 255 by `share`
+    """
+    low, high = color_range
+    return (low, high + int((255 - high) * share))
+
+
 def main():
     brightness_idx = BRIGHTNESS_INITIAL_IDX
     with npfirefly.NeoPixelFirefly(
@@ -87,38 +126,104 @@ def main():
         min_steps=MIN_STEPS,
         max_steps=MAX_STEPS,
         extra_neopixels=[cp.pixels],
+        low_memory=LOW_MEMORY,
     ) as fireflies:
         brightness_idx = BRIGHTNESS_INITIAL_IDX
         cp.pixels.brightness = BRIGHTNESS_VALUES[brightness_idx]
         fireflies.neopixels.brightness = BRIGHTNESS_VALUES[brightness_idx]
+        if RECORD_PATH is not None:
+            Recorder(
+                fireflies.neopixels, open(RECORD_PATH, "wb"), max_frames=RECORD_FRAMES
+            )
         cp.red_led = False
-        debounce = time.monotonic()
+        countdown = 0
+        new_fireflies = 0
+
+        def next_brightness():
+            nonlocal brightness_idx
+            brightness_idx = (brightness_idx + 1) % len(BRIGHTNESS_VALUES)
+            fireflies.neopixels.brightness = BRIGHTNESS_VALUES[brightness_idx]
+            cp.pixels.brightness = BRIGHTNESS_VALUES[brightness_idx]
+            # Brightness is applied on show, send the unchanged frames again
+            fireflies.canvas.mark()
+
+        # Hand the buttons over from `cp` to the keypad scanner
+        cp._a.deinit()
+        cp._b.deinit()
+        buttons = Buttons(
+            [
+                ClickButton(board.BUTTON_A, press_callback=lambda: scheduler.stop()),
+                ClickButton(board.BUTTON_B, press_callback=next_brightness),
+            ]
+        )
+        # And the light sensor to a block sampler
+        cp._light._photocell.deinit()
+        light = Sampler(board.LIGHT, LIGHT_SAMPLES, LIGHT_SAMPLE_RATE)
+        # And the microphone to the band analyzer. Only the Bluefruit driver
+        # opens it, the Express one has no sound_level
+        if hasattr(cp, "_mic"):
+            cp._mic.deinit()
+        mic = audiobusio.PDMIn(
+            board.MICROPHONE_CLOCK,
+            board.MICROPHONE_DATA,
+            sample_rate=SOUND_SAMPLE_RATE,
+            bit_depth=16,
+        )
+        samples = array("H", [0] * SOUND_BLOCK)
+        analyzer = BandAnalyzer(SOUND_BLOCK, SOUND_SAMPLE_RATE)
+        if MEMORY_REPORT:
+            memory_report(
+                [
+                    ("Fireflies", fireflies),
+                    ("Light", light),
+                    ("Sound samples", samples),
+                    ("Band analyzer", analyzer),
+                ]
+            )
+
+        def read_sound(dt):
+            nonlocal new_fireflies
+            mic.record(samples, len(samples))
+            analyzer.analyze(samples)
+            level = int((analyzer.level - LEVEL_OFSET) * LEVEL_SENSIBILITY)
+            if analyzer.onset:
+                level += BEAT_FIREFLIES
+            if level > new_fireflies:
+                new_fireflies = level
+            total = analyzer.bass + analyzer.mid + analyzer.treble or 1
+            # Treble makes quick fireflies, bass slow ones
+            fireflies.max_steps = MIN_STEPS + int(
+                (MAX_STEPS - MIN_STEPS) * (1 - analyzer.treble / total)
+            )
+            # And they tint the colors red, green and blue
+            fireflies.red_range = tint(red_range, analyzer.bass / total)
+            fireflies.green_range = tint(green_range, analyzer.mid / total)
+            fireflies.blue_range = tint(blue_range, analyzer.treble / total)
+
+        def render(dt):
+            nonlocal countdown, new_fireflies
+            for _ in range(new_fireflies):
+                fireflies.flicker(final_color=(0, 0, 0))
+            new_fireflies = 0
+            fireflies.update()
+            fireflies.show()
+            countdown -= 1
+            if countdown <= 0:
+                scheduler.stop()
+
+        scheduler = Scheduler(collect_idle=GC_IDLE, collect_after=GC_AFTER)
+        scheduler.every(1 / BUTTONS_RATE, lambda dt: buttons.update())
+        scheduler.every(1 / SOUND_RATE, read_sound)
+        scheduler.every(1 / FRAME_RATE, render)
         while True:
-            red, green, blue = sample_colors()
+            red, green, blue = sample_colors(buttons, light)
             red_range, green_range, blue_range = randomize_range(red, green, blue)
 
             fireflies.red_range = red_range
             fireflies.green_range = green_range
             fireflies.blue_range = blue_range
-            countdown = (random.random() + 1) * 10000
-            for _ in range(countdown):
-                # Reads sensor
-                if cp.button_a:
-                    break
-                elif cp.button_b:
-                    t = time.monotonic()
-                    if t - debounce > DEBOUNCE_TIMEOUT:
-                        debounce = t
-                        brightness_idx = (brightness_idx + 1) % len(BRIGHTNESS_VALUES)
-                        fireflies.neopixels.brightness = BRIGHTNESS_VALUES[
-                            brightness_idx
-                        ]
-                        cp.pixels.brightness = BRIGHTNESS_VALUES[brightness_idx]
-
-                for _ in range(int((cp.sound_level - LEVEL_OFSET) * LEVEL_SENSIBILITY)):
-                    fireflies.flicker(final_color=(0, 0, 0))
-                fireflies.update()
-                fireflies.show()
+            countdown = int((random.random() + 1) * 10000)
+            scheduler.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+"""
+Several pixel strips drawn as one
+"""
+from array import array
+
+
+class Canvas:
+    """
+    Maps a flat run of pixels onto `strips` (NeoPixel, DotStar,
+    `cp.pixels`...), one after the other. Every index is routed through
+    precomputed tables, so the cost of a write does not grow with the
+    number of strips.
+
+    Strips are switched to `auto_write = False`. Writes mark their strip
+    dirty and `show` sends each dirty strip once.
+    """
+
+    def __init__(self, strips):
+        self.strips = strips
+        self.offsets = array("H", [0] * (len(strips) + 1))
+        for s, strip in enumerate(strips):
+            strip.auto_write = False
+            self.offsets[s + 1] = self.offsets[s] + len(strip)
+        self.n = self.offsets[-1]
+        self._strip = bytearray(self.n)
+        self._position = array("H", [0] * self.n)
+        for s in range(len(strips)):
+            for index in range(self.offsets[s], self.offsets[s + 1]):
+                self._strip[index] = s
+                self._position[index] = index - self.offsets[s]
+        self.dirty = bytearray(len(strips))
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, index, value):
+        s = self._strip[index]
+        self.strips[s][self._position[index]] = value
+        self.dirty[s] = 1
+
+    def __getitem__(self, index):
+        return self.strips[self._strip[index]][self._position[index]]
+
+    def fill(self, color):
+        for s in range(len(self.strips)):
+            self.strips[s].fill(color)
+            self.dirty[s] = 1
+
+    def mark(self, strip=None):
+        """
+        Marks the strip at position `strip` in `strips` as changed, after
+        writing to it directly or changing its brightness. All strips
+        when `strip` is None.
+        """
+        if strip is None:
+            for s in range(len(self.strips)):
+                self.dirty[s] = 1
+        else:
+            self.dirty[strip] = 1
+
+    def memory(self):
+        """
+        Buffers of the routing tables, by name
+        """
+        return {
+            "offsets": self.offsets,
+            "strip_index": self._strip,
+            "position": self._position,
+            "dirty": self.dirty,
+        }
+
+    def show(self):
+        """
+        Sends the strips changed since the last call
+        """
+        # Indexed, as `enumerate` allocates
+        for s in range(len(self.strips)):
+            if self.dirty[s]:
+                self.strips[s].show()
+                self.dirty[s] = 0
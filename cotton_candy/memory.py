@@ -0,0 +1,48 @@
+"""
+Memory accounting
+"""
+import gc
+
+
+def nbytes(buffer):
+    """
+    Bytes held by `buffer`: an `array`, `bytearray`, `memoryview` or
+    `ulab` array. Views of other buffers count as their own size too.
+    """
+    if buffer is None:
+        return 0
+    size = getattr(buffer, "nbytes", None)
+    if size is not None:
+        return size
+    if len(buffer) == 0:
+        return 0
+    # MicroPython arrays have no `itemsize`, measure a single item
+    return len(buffer) * len(bytes(buffer[:1]))
+
+
+def memory_report(components):
+    """
+    Prints the bytes of the buffers of each component, `(name, object)`
+    pairs whose objects have a `memory` method returning a dict of their
+    buffers by name, or are a buffer. Returns the total.
+    """
+    total = 0
+    for name, component in components:
+        if hasattr(component, "memory"):
+            buffers = component.memory()
+        else:
+            buffers = {"buffer": component}
+        subtotal = 0
+        print(name)
+        for key in sorted(buffers):
+            size = nbytes(buffers[key])
+            if size:
+                print("  {:<24}{:>8}".format(key, size))
+            subtotal += size
+        print("  {:<24}{:>8}".format("total", subtotal))
+        total += subtotal
+    print("{:<26}{:>8}".format("Total", total))
+    if hasattr(gc, "mem_free"):
+        gc.collect()
+        print("{:<26}{:>8}".format("Free", gc.mem_free()))
+    return total
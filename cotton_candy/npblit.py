@@ -0,0 +1,146 @@
+"""
+Bulk pixel writes for NeoPixel strips
+"""
+from array import array
+
+_luts = {}
+_max_luts = 4
+# Last table returned, found again without building a key
+_last = [None, None, None]
+
+
+def brightness_table(brightness, gamma=1.0):
+    """
+    Returns a 256 entry lookup table that scales a color byte by
+    `brightness`, after a `gamma` correction when it is not 1.
+    Values are truncated, as PixelBuf scales them, so a table matches
+    the strip brightness. Tables are cached, so call it as often as you
+    like.
+    """
+    last = _last
+    if brightness == last[0] and gamma == last[1]:
+        return last[2]
+    key = (brightness, gamma)
+    lut = _luts.get(key)
+    if lut is None:
+        if len(_luts) >= _max_luts:
+            _luts.clear()
+        if gamma == 1:
+            lut = bytes(int(v * brightness) for v in range(256))
+        else:
+            lut = bytes(int(255 * (v / 255) ** gamma * brightness) for v in range(256))
+        _luts[key] = lut
+    last[0] = brightness
+    last[1] = gamma
+    last[2] = lut
+    return lut
+
+
+def _buffered(pixels):
+    """
+    True when `pixels` is a python PixelBuf with 3 bytes per pixel,
+    whose buffer can be written with plain slice copies.
+    """
+    return (
+        getattr(pixels, "_post_brightness_buffer", None) is not None
+        and pixels._pixel_step == 3
+    )
+
+
+def pixel_order(pixels):
+    """
+    Position of the red, green and blue bytes in each triple of the
+    packed data taken by `blit`.
+    """
+    if _buffered(pixels):
+        return pixels._byteorder[:3]
+    return (0, 1, 2)
+
+
+def to_pixel_order(pixels, rgb):
+    """
+    Returns a copy of the packed RGB triples in `rgb`, like a
+    `create_color_table` output, rearranged with `pixel_order`.
+    """
+    r, g, b = pixel_order(pixels)
+    data = array("B", bytes(len(rgb)))
+    for j in range(0, len(rgb) - 2, 3):
+        data[j + r] = rgb[j]
+        data[j + g] = rgb[j + 1]
+        data[j + b] = rgb[j + 2]
+    return data
+
+
+def blit(pixels, data, start=0, lut=None, scaled=None, first=0, count=None):
+    """
+    Copies the packed triples in `data` (an `array("B")`, `bytearray`
+    or `memoryview` laid out with `pixel_order`) into `pixels`, starting
+    at pixel `start`.
+
+    The strip brightness is applied with `lut`, a `brightness_table`,
+    when supplied. Otherwise the strip own brightness is used. Callers
+    that already scaled `data` with it can pass the result as `scaled`.
+
+    With `count`, only the `count` pixels of `data` from pixel `first`
+    are copied, to pixel `start + first` on. They are copied one by one
+    rather than from a slice of `data`, so nothing is allocated.
+    """
+    size = len(data) // 3
+    if count is None or (first == 0 and count == size):
+        first = 0
+        count = size
+        whole = True
+    else:
+        whole = False
+        scaled = None
+    post = getattr(pixels, "_post_brightness_buffer", None)
+    if post is None:
+        if whole:
+            # Core PixelBuf takes flat slices and scales them natively
+            pixels[start : start + size] = data
+        else:
+            # Packed into ints, which PixelBuf takes without a tuple
+            for i in range(start + first, start + first + count):
+                j = 3 * (i - start)
+                pixels[i] = (data[j] << 16) | (data[j + 1] << 8) | data[j + 2]
+    else:
+        pre = pixels._pre_brightness_buffer
+        if lut is None and pre is not None:
+            lut = brightness_table(pixels._brightness)
+        step = pixels._pixel_step
+        o = pixels._offset + (start + first) * step
+        if step == 3 and whole:
+            end = o + len(data)
+            if pre is not None:
+                pre[o:end] = data
+            if scaled is not None:
+                post[o:end] = scaled
+            elif lut is None:
+                post[o:end] = data
+            else:
+                for j in range(len(data)):
+                    post[o + j] = lut[data[j]]
+        else:
+            # A span of the strip, or DotStars and RGBW strips, whose
+            # data is plain RGB
+            if step == 3:
+                r, g, b = 0, 1, 2
+            else:
+                order = pixels._byteorder
+                r, g, b = order[0], order[1], order[2]
+            for j in range(3 * first, 3 * (first + count), 3):
+                if pre is not None:
+                    pre[o + r] = data[j]
+                    pre[o + g] = data[j + 1]
+                    pre[o + b] = data[j + 2]
+                if lut is None:
+                    post[o + r] = data[j]
+                    post[o + g] = data[j + 1]
+                    post[o + b] = data[j + 2]
+                else:
+                    post[o + r] = lut[data[j]]
+                    post[o + g] = lut[data[j + 1]]
+                    post[o + b] = lut[data[j + 2]]
+                o += step
+    if pixels.auto_write:
+        pixels.show()
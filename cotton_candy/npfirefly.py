@@ -1,6 +1,17 @@
+from array import array
 import random
 import time
 from neopixel import NeoPixel
+from compositor import Canvas
+from npblit import blit, brightness_table, pixel_order
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
 
 
 class NeoPixelFirefly:
@@ -12,11 +23,22 @@ class NeoPixelFirefly:
     * Random pixel color is chosen with `red_range`, `green_range`,
     `blue_range`.
     * Any extra neopixels may be added to the effect with
-    `extra_neopixels` argument.
+    `extra_neopixels` argument. They are drawn after the strip, as one
+    `canvas`, and sent by `show` only when they changed.
 
     Call `flicker` to set a pixel to flicker and then call `update`
     at each timestep to update pixel values.
 
+    With `ulab` (or NumPy on a computer) all the pixels are stepped with
+    whole array operations instead of a loop over the active ones.
+
+    `low_memory` keeps the remainders in 16 bits, like `ulab` does, for
+    boards with little RAM like the SAMD21 ones. Steps must then not
+    exceed 16384. `memory` lists the buffers, for `memory.memory_report`.
+
+    `flicker` and `update` allocate nothing, unless the pixels are
+    stepped with `ulab`.
+
     Please check https://github.com/luxedo/gin_tonic/tree/main/shine_bright_like_a_diamond
     for demo and examples.
     """
@@ -30,46 +52,99 @@ class NeoPixelFirefly:
         green_range=(0, 255),
         blue_range=(0, 255),
         extra_neopixels=list(),
+        low_memory=False,
         **kwargs
     ):
         self.neopixels = NeoPixel(*args, **kwargs, auto_write=False)
         self.extra_neopixels = extra_neopixels
-        for npxs in self.extra_neopixels:
-            npxs.fill((0, 0, 0))
+        self.canvas = Canvas([self.neopixels] + list(extra_neopixels))
+        for bank in range(1, len(self.canvas.strips)):
+            self.canvas.strips[bank].fill((0, 0, 0))
+            self.canvas.mark(bank)
         self.n = len(self.neopixels)
-        self.lengths = [len(self.neopixels)] + [
-            len(npxs) for npxs in self.extra_neopixels
-        ]
-        self.n_total = sum(self.lengths)
+        self.n_total = len(self.canvas)
         self.min_steps = min_steps
         self.max_steps = max_steps
         self.red_range = red_range
         self.green_range = green_range
         self.blue_range = blue_range
-        self.total_steps = [0 for i in range(self.n_total)]
-        self.current_step = [-1 for i in range(self.n_total)]
-        self.initial_color = [(0, 0, 0) for i in range(self.n_total)]
-        self.color_deltas = [(0, 0, 0) for i in range(self.n_total)]
+        # Per pixel state. Each color channel is an accumulator with an
+        # integer part and a remainder over `_denominators`, stepped by
+        # `color_deltas` and `_delta_remainders` on every update
+        self.low_memory = low_memory
+        self._vector = np is not None and not low_memory
+        if self._vector:
+            self._init_vector()
+        else:
+            self.total_steps = array("H", [0] * self.n_total)
+            self.current_step = array("H", [0] * self.n_total)
+            self.color_deltas = array("h", [0] * (3 * self.n_total))
+            remainder = "h" if low_memory else "l"
+            self._denominators = array(remainder, [0] * self.n_total)
+            self._colors = array("h", [0] * (3 * self.n_total))
+            self._remainders = array(remainder, [0] * (3 * self.n_total))
+            self._delta_remainders = array(remainder, [0] * (3 * self.n_total))
+            self._rgb = bytearray(3)
+            # Indices of the pixels being animated
+            self._active = array("H", [0] * self.n_total)
+            self._n_active = 0
+            self._frame = bytearray(3 * self.n)
+        # Random colors, drawn into buffers rather than new tuples
+        self._initial = bytearray(3)
+        self._final = bytearray(3)
+        self._order = pixel_order(self.neopixels)
+
+    def memory(self):
+        """
+        Buffers held by the effect, by name
+        """
+        strip = self.neopixels
+        buffers = {
+            "strip": getattr(strip, "_post_brightness_buffer", None),
+            "strip_pre_brightness": getattr(strip, "_pre_brightness_buffer", None),
+            "total_steps": self.total_steps,
+            "current_step": self.current_step,
+            "color_deltas": self.color_deltas,
+            "denominators": self._denominators,
+            "colors": self._colors,
+            "remainders": self._remainders,
+            "delta_remainders": self._delta_remainders,
+            "active": getattr(self, "_active", None),
+            "shown": getattr(self, "_shown", None),
+            "frame": self._frame,
+        }
+        for key, buffer in self.canvas.memory().items():
+            buffers["canvas_" + key] = buffer
+        return buffers
+
+    def _init_vector(self):
+        """
+        Same state as 2D arrays, one row per pixel. ulab has no 32 bit
+        integers, so remainders are int16 and `steps` must not exceed
+        16384.
+        """
+        pixels = (self.n_total, 1)
+        channels = (self.n_total, 3)
+        self.total_steps = np.zeros(pixels, dtype=np.uint16)
+        self.current_step = np.zeros(pixels, dtype=np.uint16)
+        self.color_deltas = np.zeros(channels, dtype=np.int16)
+        self._denominators = np.zeros(pixels, dtype=np.int16)
+        self._colors = np.zeros(channels, dtype=np.int16)
+        self._remainders = np.zeros(channels, dtype=np.int16)
+        self._delta_remainders = np.zeros(channels, dtype=np.int16)
+        # Last color shown by each pixel
+        self._shown = np.zeros(channels, dtype=np.int16)
+        self._lut = None
+        self._frame = np.zeros((self.n, 3), dtype=np.uint8)
 
     def __len__(self):
         return self.n
 
     def __setitem__(self, index, val):
-        if index < self.n:
-            self.neopixels[index] = val
-        else:
-            index -= self.n
-            for bank in range(len(self.extra_neopixels)):
-                try:
-                    self.extra_neopixels[bank][index] = val
-                except IndexError:
-                    index -= lengths[1 + bank]
+        self.canvas[index] = val
 
     def __getitem__(self, index):
-        if index < self.n:
-            return self.neopixels[index]
-        else:
-            return self.extra_neopixels[index - self.n]
+        return self.canvas[index]
 
     def __enter__(self):
         return self
@@ -85,40 +160,153 @@ class NeoPixelFirefly:
         """
         i = i or random.randint(0, self.n_total - 1)
         steps = steps or random.randint(self.min_steps, self.max_steps)
-        initial_color = initial_color or self.random_color(
-            self.red_range, self.green_range, self.blue_range
-        )
-        final_color = final_color or self.random_color(
-            self.red_range, self.green_range, self.blue_range
-        )
+        if not initial_color:
+            initial_color = self._random_color(self._initial)
+        if not final_color:
+            final_color = self._random_color(self._final)
 
+        if not self._vector and self.current_step[i] >= self.total_steps[i]:
+            self._active[self._n_active] = i
+            self._n_active += 1
         self.total_steps[i] = steps
         self.current_step[i] = 0
-        self.initial_color[i] = initial_color
-        self.color_deltas[i] = (
-            (final_color[0] - initial_color[0]) / (steps - 1),
-            (final_color[1] - initial_color[1]) / (steps - 1),
-            (final_color[2] - initial_color[2]) / (steps - 1),
-        )
+        # Twice the fade as a fraction, so the accumulators start half a
+        # step ahead and truncating them rounds to nearest
+        den = 2 * (steps - 1)
+        self._denominators[i] = den
+        for j in range(3):
+            fade = 2 * (final_color[j] - initial_color[j])
+            # Floored like divmod, without its tuple
+            quotient = fade // den
+            k = (i, j) if self._vector else 3 * i + j
+            self._colors[k] = initial_color[j]
+            self._remainders[k] = steps - 1
+            self.color_deltas[k] = quotient
+            self._delta_remainders[k] = fade - quotient * den
 
     def update(self):
         """
         Please 🙏 call me at each tick to update the LEDs
         """
-        for i in range(self.n_total):
-            c = self.current_step[i]
-            if c < self.total_steps[i]:
-                self.current_step[i] += 1
-                I = self.initial_color[i]
-                d = self.color_deltas[i]
+        if self._vector:
+            self._update_vector()
+            return
+        frame = self._frame
+        r, g, b = self._order
+        n = len(frame) // 3
+        total_steps = self.total_steps
+        current_step = self.current_step
+        color_deltas = self.color_deltas
+        denominators = self._denominators
+        colors = self._colors
+        remainders = self._remainders
+        delta_remainders = self._delta_remainders
+        rgb = self._rgb
+        active = self._active
+        lo = n
+        hi = 0
+        k = 0
+        while k < self._n_active:
+            i = active[k]
+            den = denominators[i]
+            j = 3 * i
+            for ch in range(3):
+                q = colors[j + ch]
+                rem = remainders[j + ch]
+                # A zero remainder is an exact half, rounded to even
+                rgb[ch] = q - 1 if rem == 0 and q & 1 else q
+                rem += delta_remainders[j + ch]
+                q += color_deltas[j + ch]
+                if rem >= den:
+                    rem -= den
+                    q += 1
+                colors[j + ch] = q
+                remainders[j + ch] = rem
+            c = current_step[i] + 1
+            current_step[i] = c
+            if c < total_steps[i]:
+                k += 1
+            else:
+                self._n_active -= 1
+                active[k] = active[self._n_active]
+            if i < n:
+                frame[j + r] = rgb[0]
+                frame[j + g] = rgb[1]
+                frame[j + b] = rgb[2]
+                if i < lo:
+                    lo = i
+                if i >= hi:
+                    hi = i + 1
+            else:
+                self[i] = (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+        if lo < hi:
+            blit(self.neopixels, frame, first=lo, count=hi - lo)
+            self.canvas.mark(0)
+
+    def _scale(self, frame):
+        """
+        Applies the strip brightness to `frame` as a whole array
+        """
+        lut = brightness_table(self.neopixels.brightness)
+        if lut is not self._lut:
+            self._lut = lut
+            self._np_lut = np.frombuffer(lut, dtype=np.uint8)
+        return np.take(self._np_lut, frame.flatten())
+
+    def _update_vector(self):
+        active = self.current_step < self.total_steps
+        if not np.any(active):
+            return
+        colors = self._colors
+        remainders = self._remainders
+        denominators = self._denominators
+        # A zero remainder is an exact half, rounded to even
+        odd = colors - (colors // 2) * 2
+        shown = colors - (remainders == 0) * odd
+        self._shown = self._shown + active * (shown - self._shown)
+        # Carry before adding, the sum of two remainders can overflow int16
+        delta_remainders = active * self._delta_remainders
+        carry = (remainders >= denominators - delta_remainders) * active
+        self._remainders = remainders - carry * denominators + delta_remainders
+        self._colors = colors + active * self.color_deltas + carry
+        self.current_step = self.current_step + active
+        n = self.n
+        r, g, b = self._order
+        frame = self._frame
+        frame[:, r] = self._shown[:n, 0]
+        frame[:, g] = self._shown[:n, 1]
+        frame[:, b] = self._shown[:n, 2]
+        # Only send the span of the strip that changed
+        changed = active[:n, 0]
+        if np.any(changed):
+            lo = int(np.argmax(changed))
+            hi = n - int(np.argmax(changed[::-1]))
+            span = frame[lo:hi]
+            scaled = self._scale(span).tobytes()
+            blit(self.neopixels, span.tobytes(), lo, scaled=scaled)
+            self.canvas.mark(0)
+        for i in range(n, self.n_total):
+            if active[i, 0]:
                 self[i] = (
-                    round(I[0] + c * d[0]),
-                    round(I[1] + c * d[1]),
-                    round(I[2] + c * d[2]),
+                    int(self._shown[i, 0]),
+                    int(self._shown[i, 1]),
+                    int(self._shown[i, 2]),
                 )
 
     def show(self):
-        self.neopixels.show()
+        self.canvas.show()
+
+    def _random_color(self, color):
+        """
+        Draws a color from the ranges into `color`, a `bytearray(3)`
+        """
+        low, high = self.red_range
+        color[0] = random.randint(low, high)
+        low, high = self.green_range
+        color[1] = random.randint(low, high)
+        low, high = self.blue_range
+        color[2] = random.randint(low, high)
+        return color
 
     @staticmethod
     def random_color(red_range, green_range, blue_range):
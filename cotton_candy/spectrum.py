@@ -0,0 +1,131 @@
+"""
+Audio band analyzer
+"""
+import math
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+
+class BandAnalyzer:
+    """
+    Splits blocks of `size` audio samples, taken at `sample_rate`, into
+    `bass`, `mid` and `treble` energies: the mean square amplitude below
+    `bass_cutoff`, between the cutoffs and above `treble_cutoff` Hz.
+
+    `onset` is True after a block whose bass energy jumps above
+    `onset_ratio` times its running average, which is a beat.
+
+    Bands come from an FFT with `ulab` (or NumPy on a computer), in which
+    case `size` must be a power of two. Boards without either split
+    the bands with two one pole low pass filters instead.
+    """
+
+    def __init__(
+        self,
+        size,
+        sample_rate,
+        bass_cutoff=250,
+        treble_cutoff=2000,
+        onset_ratio=2.0,
+        min_onset_energy=1e4,
+        average_weight=0.1,
+    ):
+        self.size = size
+        self.sample_rate = sample_rate
+        self.onset_ratio = onset_ratio
+        self.min_onset_energy = min_onset_energy
+        self.average_weight = average_weight
+        self.bass = 0
+        self.mid = 0
+        self.treble = 0
+        self.onset = False
+        self.bass_average = 0
+        if np is not None:
+            resolution = sample_rate / size
+            self._bass_bin = max(2, int(bass_cutoff / resolution) + 1)
+            self._treble_bin = max(self._bass_bin, int(treble_cutoff / resolution) + 1)
+            # Hann window, scaled so the bands add up to the mean square
+            self._window = 0.5 - 0.5 * np.cos(
+                np.linspace(0, 2 * math.pi, size, endpoint=False)
+            )
+            self._scale = 2 / (size * np.sum(self._window * self._window))
+        else:
+            self._bass_alpha = 1 - math.exp(-2 * math.pi * bass_cutoff / sample_rate)
+            self._treble_alpha = 1 - math.exp(
+                -2 * math.pi * treble_cutoff / sample_rate
+            )
+            self._bass_low = 0
+            self._treble_low = 0
+
+    def analyze(self, samples):
+        """
+        Updates the band energies and `onset` from a block of samples
+        """
+        mean = sum(samples) / len(samples)
+        if np is not None:
+            self._analyze_fft(samples, mean)
+        else:
+            self._analyze_filters(samples, mean)
+        self.onset = (
+            self.bass > self.onset_ratio * self.bass_average
+            and self.bass > self.min_onset_energy
+        )
+        self.bass_average += (self.bass - self.bass_average) * self.average_weight
+
+    def _analyze_fft(self, samples, mean):
+        x = (np.array(samples) - mean) * self._window
+        spectrum = np.fft.fft(x)
+        if isinstance(spectrum, tuple):
+            # ulab without complex numbers returns the real and imaginary parts
+            real, imag = spectrum
+            power = real * real + imag * imag
+        else:
+            power = abs(spectrum) ** 2
+        b = self._bass_bin
+        t = self._treble_bin
+        self.bass = float(np.sum(power[1:b])) * self._scale
+        self.mid = float(np.sum(power[b:t])) * self._scale
+        self.treble = float(np.sum(power[t : self.size // 2])) * self._scale
+
+    def _analyze_filters(self, samples, mean):
+        bass_alpha = self._bass_alpha
+        treble_alpha = self._treble_alpha
+        bass_low = self._bass_low
+        treble_low = self._treble_low
+        bass = 0
+        mid = 0
+        treble = 0
+        for sample in samples:
+            x = sample - mean
+            bass_low += bass_alpha * (x - bass_low)
+            treble_low += treble_alpha * (x - treble_low)
+            bass += bass_low * bass_low
+            y = treble_low - bass_low
+            mid += y * y
+            y = x - treble_low
+            treble += y * y
+        self._bass_low = bass_low
+        self._treble_low = treble_low
+        n = len(samples)
+        self.bass = bass / n
+        self.mid = mid / n
+        self.treble = treble / n
+
+    def memory(self):
+        """
+        Buffers held by the analyzer, by name
+        """
+        return {"window": getattr(self, "_window", None)}
+
+    @property
+    def level(self):
+        """
+        RMS amplitude of the last block
+        """
+        return math.sqrt(self.bass + self.mid + self.treble)
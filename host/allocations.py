@@ -0,0 +1,174 @@
+"""
+Counts the heap allocations the project code would make on a board.
+
+    from allocations import audit
+    per_tick, sites = audit(tick, 100)
+
+CPython boxes every int above 256 and reuses tuples from free lists, so
+`tracemalloc` can't tell whether a tick would allocate under
+CircuitPython. This follows the bytecode of the project modules
+instead, and counts the objects MicroPython puts on the heap:
+
+* tuples, lists, dicts, sets and strings built by the code,
+* slices copied out of a sequence (`a[i:j]`, not `a[i:j] = b`),
+* lambdas, closures, comprehensions and generators,
+* `*args` and `**kwargs`, at the call and in the function called,
+* calls of the built-ins returning a new object (`memoryview`,
+  `enumerate`, `divmod`, `str.format`...), and `range` out of a `for`.
+
+Ints and floats are immediate objects in CircuitPython and are not
+counted. Neither is the code of the simulated libraries in `host/sim`,
+C modules on a board, nor what `ulab` allocates.
+"""
+import dis
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = os.path.join(ROOT, "host")
+
+_BUILDS = {
+    "BUILD_TUPLE": "tuple",
+    "BUILD_LIST": "list",
+    "BUILD_MAP": "dict",
+    "BUILD_CONST_KEY_MAP": "dict",
+    "BUILD_SET": "set",
+    "BUILD_STRING": "str",
+    "FORMAT_VALUE": "str",
+    "MAKE_FUNCTION": "function",
+    "CALL_FUNCTION_EX": "*args",
+    "RETURN_GENERATOR": "generator",
+    "GEN_START": "generator",
+}
+_ALLOCATING = {
+    "array",
+    "bytearray",
+    "bytes",
+    "copy",
+    "decode",
+    "dict",
+    "divmod",
+    "encode",
+    "enumerate",
+    "filter",
+    "format",
+    "hex",
+    "items",
+    "iter",
+    "join",
+    "keys",
+    "list",
+    "map",
+    "memoryview",
+    "range",
+    "repr",
+    "reversed",
+    "set",
+    "sorted",
+    "split",
+    "str",
+    "tobytes",
+    "tuple",
+    "values",
+    "zip",
+}
+# Calls are PRECALL + CALL up to Python 3.11, CALL alone after
+_CALL = "PRECALL" if "PRECALL" in dis.opmap else "CALL"
+_VARARGS = 0x04 | 0x08  # CO_VARARGS | CO_VARKEYWORDS
+
+
+def _stack_effect(instruction):
+    if instruction.opcode < dis.HAVE_ARGUMENT:
+        return dis.stack_effect(instruction.opcode)
+    return dis.stack_effect(instruction.opcode, instruction.arg, jump=False)
+
+
+def _callee(instructions, k):
+    """
+    Name loading the callable of the call at `instructions[k]`, found
+    walking back over its arguments
+    """
+    needed = instructions[k].arg + 1
+    pushed = 0
+    for j in range(k - 1, -1, -1):
+        pushed += _stack_effect(instructions[j])
+        if pushed >= needed:
+            argval = instructions[j].argval
+            return argval if isinstance(argval, str) else None
+    return None
+
+
+def _sites(code):
+    """
+    Maps the offsets of the allocating instructions of `code` to what
+    they allocate
+    """
+    instructions = [i for i in dis.get_instructions(code) if i.opname != "CACHE"]
+    sites = {}
+    for k, instruction in enumerate(instructions):
+        name = instruction.opname
+        following = instructions[k + 1].opname if k + 1 < len(instructions) else None
+        if name in _BUILDS:
+            sites[instruction.offset] = _BUILDS[name]
+        elif name == "BUILD_SLICE" and following == "BINARY_SUBSCR":
+            sites[instruction.offset] = "slice"
+        elif name == "BINARY_SLICE":
+            sites[instruction.offset] = "slice"
+        elif name == _CALL:
+            callee = _callee(instructions, k)
+            if callee in _ALLOCATING:
+                after = [
+                    i.opname
+                    for i in instructions[k + 1 : k + 3]
+                    if i.opname not in ("CALL", "PRECALL")
+                ]
+                if callee == "range" and after[:1] == ["GET_ITER"]:
+                    continue  # Compiled to a counter loop
+                sites[instruction.offset] = callee
+    return sites
+
+
+def audit(tick, ticks, root=ROOT):
+    """
+    Calls `tick` `ticks` times and returns the heap allocations made by
+    the code under `root`, out of `host`, per tick and a dict counting
+    them by `"file:line what"`.
+    """
+    cache = {}
+    counts = {}
+
+    def count(site):
+        counts[site] = counts.get(site, 0) + 1
+
+    def trace(frame, event, arg):
+        code = frame.f_code
+        sites = cache.get(code)
+        if sites is None:
+            sites = cache[code] = _sites(code)
+        if event == "opcode":
+            what = sites.get(frame.f_lasti)
+            if what is not None:
+                count("{}:{} {}".format(_name(code), frame.f_lineno, what))
+        return trace
+
+    def enter(frame, event, arg):
+        code = frame.f_code
+        filename = os.path.abspath(code.co_filename)
+        if not filename.startswith(root) or filename.startswith(HOST):
+            return None
+        frame.f_trace_opcodes = True
+        if code.co_flags & _VARARGS:
+            count("{}:{} *args".format(_name(code), code.co_firstlineno))
+        return trace
+
+    sys.settrace(enter)
+    try:
+        for _ in range(ticks):
+            tick()
+    finally:
+        sys.settrace(None)
+    return sum(counts.values()) / ticks, counts
+
+
+def _name(code):
+    return os.path.relpath(code.co_filename, ROOT)
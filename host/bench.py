@@ -0,0 +1,386 @@
+"""
+Benchmarks the effects and peripherals against the simulated hardware.
+
+    python host/bench.py
+    python host/bench.py --pixels 20 77 300 --ticks 500 --save baseline.json
+    python host/bench.py --compare baseline.json
+
+    python host/bench.py --pixels 77 --no-vector --no-alloc
+
+Each scenario drives one class through a fixed, seeded script and
+reports ticks per second, per call latency percentiles and bytes
+allocated per tick. Allocations are the tracemalloc transient peak of
+each tick (CPython boxes ints above 256, so expect a small floor).
+
+The heap objects a board would allocate per tick are counted too, by
+`allocations.audit`. `--no-alloc` fails the scenarios that allocate
+any, so the main loops stay free of garbage collections.
+"""
+import gc
+import json
+import math
+import random
+import time
+import tracemalloc
+
+try:
+    from allocations import audit
+except ImportError:
+    audit = None
+
+_now_ns = time.perf_counter_ns
+
+PIXELS = (20, 77, 150, 300)
+TICKS = 300
+AUDIT_TICKS = 50  # Ticks followed by `audit`, much slower than the others
+SLACK_US = 1.0  # Timer jitter, larger than the fastest scenarios take
+
+
+def measure(tick, ticks=TICKS, warmup=10):
+    """
+    Calls `tick` `ticks` times and returns its statistics: ticks per
+    second, 50th, 90th and 99th latency percentiles in microseconds,
+    bytes allocated per tick and, on host, heap objects a board would
+    allocate per tick and where.
+    """
+    for _ in range(warmup):
+        tick()
+    gc.collect()
+    latencies = []
+    for _ in range(ticks):
+        start = _now_ns()
+        tick()
+        latencies.append(_now_ns() - start)
+    latencies.sort()
+    total = sum(latencies)
+    result = {
+        "ticks_per_s": ticks * 1e9 / total if total else 0,
+        "p50_us": percentile(latencies, 50) / 1000,
+        "p90_us": percentile(latencies, 90) / 1000,
+        "p99_us": percentile(latencies, 99) / 1000,
+        "alloc_bytes": allocations(tick, ticks),
+    }
+    if audit is not None:
+        result["heap_objects"], result["heap_sites"] = audit(
+            tick, min(ticks, AUDIT_TICKS)
+        )
+    return result
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, (len(values) * p) // 100)]
+
+
+def allocations(tick, ticks):
+    """
+    Mean bytes allocated by each call of `tick`.
+    """
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(ticks):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tick()
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return allocated / ticks
+
+
+# Scenarios
+def rainbow(n, hue_range=(0.0, 1.0), speed=10, show=False, rotate=False):
+    import board
+    from nprainbow import NeoPixelRainbow
+
+    pixels = NeoPixelRainbow(
+        board.GP18,
+        n,
+        brightness=0.2,
+        color_delta=0.3,
+        initial_hue=0.0,
+        hue_range=hue_range,
+        speed=speed,
+        steps=256,
+        saturation=1.0,
+        rotate=rotate,
+        auto_write=False,
+    )
+    if not show:
+        return pixels.update
+
+    def tick():
+        pixels.update()
+        pixels.show()
+
+    return tick
+
+
+def firefly(module, n, probability=0.2, fireflies=3):
+    import board
+
+    rng = random.Random(n)
+    pixels = module.NeoPixelFirefly(pin=board.A1, n=n, min_steps=8, max_steps=32)
+
+    def tick():
+        if rng.random() < probability:
+            for _ in range(fireflies):
+                pixels.flicker(i=rng.randint(1, n - 1), final_color=(0, 0, 0))
+        pixels.update()
+
+    return tick
+
+
+def pot_sequence(code):
+    import board
+    import simulator
+
+    simulator.source("A0", lambda t: 32768 + 30000 * math.sin(40 * t))
+    simulator.source("A2", lambda t: 32768 + 30000 * math.cos(25 * t))
+    pixels = rainbow(77).__self__
+    pots = [
+        code.Potentiometer(
+            code.analogio.AnalogIn(pin),
+            0.5,
+            (0, 1),
+            callback=lambda value: None,
+            profile=profile,
+            name=profile,
+        )
+        for pin, profile in (
+            (board.A0, "linear"),
+            (board.A2, "quadratic"),
+            (board.A0, "symmetric_cubic"),
+            (board.A2, "cubic"),
+        )
+    ]
+    for pot in pots:
+        pot.unlock()
+    sequence = code.PotSequence(
+        [
+            {"color": (255, 0, 0), "pots": pots[:2]},
+            {"color": (0, 255, 0), "pots": pots[2:]},
+        ],
+        pixels=pixels,
+    )
+    return sequence.update
+
+
+def click_button(code):
+    import board
+    import simulator
+
+    simulator.source("GP11", lambda t: (t * 20) % 1 < 0.5)
+    button = code.ClickButton(
+        board.GP11,
+        press_callback=lambda: None,
+        release_callback=lambda: None,
+        hold_callback=lambda: None,
+    )
+    buttons = code.Buttons([button])
+
+    def tick():
+        # Events are timestamped in virtual time, run it at 100 Hz
+        simulator.clock.advance(0.01)
+        buttons.update()
+
+    return tick
+
+
+def scheduler(module, tasks=3):
+    import simulator
+
+    clock = simulator.clock
+    tasks_scheduler = module.Scheduler(sleep=clock.sleep)
+    for k in range(tasks):
+        tasks_scheduler.every(1 / (50 * (k + 1)), lambda dt: None)
+
+    def tick():
+        # A round of `Scheduler.run`
+        idle = tasks_scheduler.collect(tasks_scheduler.step())
+        if idle > 0:
+            tasks_scheduler.sleep(idle)
+
+    return tick
+
+
+def band_analyzer(module, size=256, sample_rate=16000):
+    from array import array
+
+    rng = random.Random(size)
+    samples = array(
+        "H",
+        [
+            int(32768 + 8000 * math.sin(2 * math.pi * 100 * i / sample_rate))
+            + rng.randint(-500, 500)
+            for i in range(size)
+        ],
+    )
+    analyzer = module.BandAnalyzer(size, sample_rate)
+    return lambda: analyzer.analyze(samples)
+
+
+def scenarios(pixels, vector=True):
+    """
+    Yields `(name, setup)` for every scenario, `setup` returning the
+    function called at each tick. Without `vector` the effects render
+    with their pure python loops even when NumPy is installed.
+    """
+    from run import load
+
+    code = load("aegean_sea", "code")
+    cotton_candy = load("cotton_candy", "npfirefly")
+    shine_bright = load("shine_bright_like_a_diamond", "npfirefly")
+    spectrum = load("cotton_candy", "spectrum")
+    scheduler_module = load("aegean_sea", "scheduler")
+    if not vector:
+        import nprainbow
+
+        for module in (nprainbow, cotton_candy, shine_bright):
+            module.np = None
+    for n in pixels:
+        yield "rainbow_loop/{}".format(n), lambda n=n: rainbow(n)
+        yield "rainbow_bounce/{}".format(n), lambda n=n: rainbow(n, (0.2, 0.6))
+        yield "rainbow_rotate/{}".format(n), lambda n=n: rainbow(n, rotate=True)
+        yield "rainbow_idle/{}".format(n), lambda n=n: rainbow(n, speed=0, show=True)
+        yield "firefly_cotton_candy/{}".format(n), lambda n=n: firefly(cotton_candy, n)
+        yield "firefly_shine_bright/{}".format(n), lambda n=n: firefly(shine_bright, n)
+        yield "firefly_swarm/{}".format(n), lambda n=n: firefly(
+            cotton_candy, n, probability=1, fireflies=n // 8
+        )
+    yield "pot_sequence", lambda: pot_sequence(code)
+    yield "click_button", lambda: click_button(code)
+    yield "scheduler", lambda: scheduler(scheduler_module)
+    yield "band_analyzer", lambda: band_analyzer(spectrum)
+
+
+def run_all(pixels=PIXELS, ticks=TICKS, only=None, vector=True):
+    import simulator
+
+    results = {}
+    for name, setup in scenarios(pixels, vector):
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        simulator.reset()
+        results[name] = measure(setup(), ticks)
+        print(format_result(name, results[name]))
+    return results
+
+
+def format_result(name, result):
+    line = (
+        "{:28s} {:10.1f} ticks/s  p50 {:8.1f} us  p90 {:8.1f} us  "
+        "p99 {:8.1f} us  {:8.1f} B/tick"
+    ).format(
+        name,
+        result["ticks_per_s"],
+        result["p50_us"],
+        result["p90_us"],
+        result["p99_us"],
+        result["alloc_bytes"],
+    )
+    if result.get("heap_objects") is not None:
+        line += "  {:6.2f} obj/tick".format(result["heap_objects"])
+    return line
+
+
+def allocating(results):
+    """
+    Returns the scenarios allocating on the heap at each tick, as
+    counted by `audit`, or from the bytes allocated without it.
+    """
+    found = []
+    for name, result in results.items():
+        objects = result.get("heap_objects")
+        if objects is None:
+            if result["alloc_bytes"] > 0:
+                found.append("{}: {:.1f} B/tick".format(name, result["alloc_bytes"]))
+        elif objects > 0:
+            sites = result["heap_sites"]
+            top = sorted(sites, key=lambda site: -sites[site])[:3]
+            found.append(
+                "{}: {:.2f} obj/tick, at {}".format(name, objects, ", ".join(top))
+            )
+    return found
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the scenarios slower than `baseline` by more than
+    `tolerance` or allocating more than it. Speed is the median latency,
+    steadier than the mean over a few hundred ticks.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p50_us"] > base["p50_us"] * (1 + tolerance) + SLACK_US:
+            regressions.append(
+                "{}: p50 {:.1f} us, baseline {:.1f}".format(
+                    name, result["p50_us"], base["p50_us"]
+                )
+            )
+        if result["alloc_bytes"] > base["alloc_bytes"] * (1 + tolerance) + 1:
+            regressions.append(
+                "{}: {:.1f} B/tick, baseline {:.1f}".format(
+                    name, result["alloc_bytes"], base["alloc_bytes"]
+                )
+            )
+        objects = result.get("heap_objects")
+        base_objects = base.get("heap_objects")
+        if None not in (objects, base_objects) and objects > base_objects + 0.01:
+            regressions.append(
+                "{}: {:.2f} obj/tick, baseline {:.2f}".format(
+                    name, objects, base_objects
+                )
+            )
+    return regressions
+
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pixels", type=int, nargs="+", default=PIXELS)
+    parser.add_argument("--ticks", type=int, default=TICKS)
+    parser.add_argument("--only", nargs="+", help="scenario name prefixes")
+    parser.add_argument(
+        "--no-vector",
+        action="store_true",
+        help="render with the pure python loops even if NumPy is installed",
+    )
+    parser.add_argument("--save", help="write the results to a baseline file")
+    parser.add_argument("--compare", help="baseline file to check against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown ratio"
+    )
+    parser.add_argument(
+        "--no-alloc",
+        action="store_true",
+        help="fail the scenarios that allocate on the heap at each tick",
+    )
+    args = parser.parse_args()
+
+    from run import simulator
+
+    simulator.install()
+    results = run_all(args.pixels, args.ticks, args.only, not args.no_vector)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    failed = False
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        failed = bool(regressions)
+    if args.no_alloc:
+        for scenario in allocating(results):
+            print("ALLOCATES", scenario)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""
+Checks the rewrites of the effects against the code they replaced.
+
+    python host/check.py
+    python host/check.py --only curves
+
+Each check compares a rewrite with a reference over a sweep of its
+inputs and prints the worst error next to its bound: table and integer
+math against float math, and frames rendered by the `low_memory`,
+vectorized and recorded paths against the default ones. The script
+exits with an error when an error is over its bound.
+"""
+import colorsys
+import io
+import random
+import sys
+from array import array
+
+from run import load
+
+# Raw readings spanned by the aegean_sea potentiometers
+POT_LOW = 2000
+POT_HIGH = 63500
+FADE_PIXELS = 256
+FADE_STEPS = tuple(range(2, 41)) + (64, 255, 1000)
+HSV_LEVELS = tuple(range(0, 256, 17)) + (1, 128, 254)
+TICKS = 200
+RAINBOW_PIXELS = 77
+RAINBOW = {
+    "brightness": 0.3,
+    "color_delta": 0.7,
+    "initial_hue": 0,
+    "hue_range": (0, 1),
+    "speed": 30,
+    "steps": 256,
+    "saturation": 1.0,
+    "auto_write": False,
+}
+# Rainbow attributes changed at some ticks, to rebuild its tables
+RAINBOW_CHANGES = {
+    50: ("saturation", 0.4),
+    90: ("color_delta", 2.5),
+    120: ("brightness", 0.8),
+    150: ("hue_range", (0.1, 0.9)),
+}
+FIREFLY_PIXELS = 150
+FIREFLY_PROJECTS = ("cotton_candy", "shine_bright_like_a_diamond")
+# Buffers of the python PixelBuf, missing from the core one
+PYTHON_BUFFERS = ("_post_brightness_buffer", "_pre_brightness_buffer")
+
+
+def bisection(f, a, b, n=100):
+    """
+    Root of the increasing `f` in [a, b], as the potentiometers found
+    their locked readings before the curves had inverses
+    """
+    for _ in range(n):
+        m = (a + b) / 2
+        if f(m) < 0:
+            a = m
+        else:
+            b = m
+    return (a + b) / 2
+
+
+def check_curves():
+    """
+    Curve tables against the float curves, and `Curve.reading` against a
+    bisection of the float curves
+    """
+    curves = load("aegean_sea", "curves")
+    span = POT_HIGH - POT_LOW
+
+    def float_curves():
+        for k in (1, 2, 3):
+            yield "power({})".format(k), lambda x, k=k: x**k, k
+        for k in (3, 5, 7):
+            yield "symmetric({})".format(k), (
+                lambda x, k=k: ((2 * x - 1) ** k + 1) / 2
+            ), k
+        yield "piecewise", lambda x: (
+            0.2 * x if x < 0.5 else 0.1 + 1.8 * (x - 0.5)
+        ), 1.8
+
+    references = {
+        "power(1)": curves.LINEAR,
+        "power(2)": curves.QUADRATIC,
+        "power(3)": curves.CUBIC,
+        "symmetric(3)": curves.SYMMETRIC_CUBIC,
+        "symmetric(5)": curves.SYMMETRIC_FIFTH,
+        "symmetric(7)": curves.SYMMETRIC_SEVENTH,
+        "piecewise": curves.piecewise([(0, 0), (0.5, 0.1), (1, 1)]),
+    }
+    for name, fn, slope in float_curves():
+        curve = references[name]
+        for bits in (curve.bits, 8):
+            table = curve.table(POT_LOW, POT_HIGH, bits)
+            shift = 16 - bits
+            half = (1 << shift) >> 1
+            worst = 0
+            for i in range(len(table)):
+                x = min(max(((i << shift) + half - POT_LOW) / span, 0), 1)
+                worst = max(worst, abs(table[i] - curves.FULL_SCALE * fn(x)))
+            yield "{} {} bit table".format(name, bits), worst, 0.5, "counts"
+        # Readings are compared by their responses: where a curve is flat
+        # many readings share a response and the bisection lands on any.
+        # Rounding a reading moves its response by half a count times the
+        # steepest slope, a table entry by half an entry.
+        table = curve.table(POT_LOW, POT_HIGH)
+        entry = (1 << curve.shift) / span
+        worst_reading = 0
+        worst_value = 0
+        for k in range(1001):
+            response = k / 1000
+            reading = curve.reading(response, POT_LOW, POT_HIGH)
+            expected = bisection(
+                lambda r: fn((r - POT_LOW) / span) - response, POT_LOW, POT_HIGH
+            )
+            error = fn((reading - POT_LOW) / span) - fn((expected - POT_LOW) / span)
+            worst_reading = max(worst_reading, abs(error))
+            value = table[reading >> curve.shift] / curves.FULL_SCALE
+            worst_value = max(worst_value, abs(value - response))
+        if curve.inverse is None:
+            # Searched in the table, so off by up to an entry
+            bound = slope * entry
+        else:
+            bound = slope * 0.5 / span
+        yield "{} reading".format(name), worst_reading, bound, "of range"
+        yield "{} lock round trip".format(name), worst_value, (
+            slope * entry + 1 / curves.FULL_SCALE
+        ), "of range"
+
+
+def _fade_error(npfirefly, steps, low_memory):
+    import board
+    import simulator
+
+    simulator.reset()
+    fireflies = npfirefly.NeoPixelFirefly(
+        board.A1, FADE_PIXELS + 1, brightness=1.0, low_memory=low_memory
+    )
+    strip = getattr(fireflies, "neopixels", fireflies)
+    fades = []
+    # Pixel 0 would make `flicker` pick a pixel at random
+    for i in range(1, FADE_PIXELS + 1):
+        initial = (i - 1, FADE_PIXELS - i, (5 * i) & 0xFF)
+        final = (FADE_PIXELS - i, (3 * i) & 0xFF, i - 1)
+        fireflies.flicker(i, steps, initial, final)
+        fades.append((i, initial, final))
+    worst = 0
+    for c in range(steps):
+        fireflies.update()
+        for i, initial, final in fades:
+            color = strip[i]
+            for ch in range(3):
+                expected = round(
+                    initial[ch] + c * (final[ch] - initial[ch]) / (steps - 1)
+                )
+                worst = max(worst, abs(color[ch] - expected))
+    return worst
+
+
+def check_fades():
+    """
+    Integer firefly fades against the float interpolation they replaced,
+    on every path the effect renders with
+    """
+    for project in ("cotton_candy", "shine_bright_like_a_diamond"):
+        npfirefly = load(project, "npfirefly")
+        numpy = npfirefly.np
+        paths = [("scalar", None, False), ("low_memory", None, True)]
+        if numpy is not None:
+            paths.append(("vector", numpy, False))
+        for path, np, low_memory in paths:
+            npfirefly.np = np
+            worst = 0
+            for steps in FADE_STEPS:
+                worst = max(worst, _fade_error(npfirefly, steps, low_memory))
+            # The float code rounds exact halves either way, depending on
+            # its representation error, where the accumulators round to even
+            yield "{} {} fades".format(project, path), worst, 1, "levels"
+        npfirefly.np = numpy
+
+
+def check_hsv():
+    """
+    Integer HSV conversion against `colorsys`, over every hue at full
+    saturation and value and a grid of saturations and values
+    """
+    hsv = load("aegean_sea", "hsv")
+    worst = 0
+    mismatches = 0
+    for s in HSV_LEVELS:
+        for v in HSV_LEVELS:
+            full = s == 255 and v == 255
+            hues = range(0, hsv.HUE_STEPS, 1 if full else 97)
+            buffer = hsv.fill_hsv(array("B", bytes(3 * len(hues))), hues, s, v)
+            for k, h in enumerate(hues):
+                expected = colorsys.hsv_to_rgb(h / hsv.HUE_STEPS, s / 255, v / 255)
+                color = hsv.hsv_to_rgb(h, s, v)
+                for ch in range(3):
+                    worst = max(worst, abs(color[ch] - 255 * expected[ch]))
+                    mismatches += buffer[3 * k + ch] != color[ch]
+    # Within one unit, as documented. Rounding to a channel takes half
+    yield "hsv_to_rgb", worst, 1, "levels"
+    yield "fill_hsv against hsv_to_rgb", mismatches, 0, "channels"
+
+
+def differences(frames, reference):
+    """
+    Frames differing from `reference`, counting the missing or extra ones
+    """
+    return sum(a != b for a, b in zip(frames, reference)) + abs(
+        len(frames) - len(reference)
+    )
+
+
+class CorePixelBuf:
+    """
+    Within a `with`, the module of `function` finds no python PixelBuf
+    buffers on the strips, as on boards with a core PixelBuf like the
+    RP2040 ones. Does nothing unless `enabled`.
+    """
+
+    def __init__(self, function, enabled=True):
+        self.globals = function.__globals__
+        self.enabled = enabled
+
+    def __enter__(self):
+        if self.enabled:
+            self.globals["getattr"] = self.getattr
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.globals.pop("getattr", None)
+
+    @staticmethod
+    def getattr(obj, name, *default):
+        if name not in PYTHON_BUFFERS:
+            return getattr(obj, name, *default)
+        if default:
+            return default[0]
+        raise AttributeError(name)
+
+
+def rainbow_frames(nprainbow, np, ticks=TICKS, core=False, **kwargs):
+    """
+    Frames sent by a `NeoPixelRainbow` rendering with `np`, or its pure
+    python loops when it is None, on a core PixelBuf with `core`
+    """
+    import board
+    import simulator
+
+    simulator.reset()
+    numpy = nprainbow.np
+    nprainbow.np = np
+    try:
+        with CorePixelBuf(nprainbow.blit, core):
+            options = dict(RAINBOW, **kwargs)
+            rainbow = nprainbow.NeoPixelRainbow(board.GP18, RAINBOW_PIXELS, **options)
+            frames = []
+            for k in range(ticks):
+                if k in RAINBOW_CHANGES:
+                    setattr(rainbow, *RAINBOW_CHANGES[k])
+                rainbow.update()
+                rainbow.show()
+                frames.append(bytes(rainbow._post_brightness_buffer))
+    finally:
+        nprainbow.np = numpy
+    return frames
+
+
+def firefly_frames(npfirefly, np, ticks=TICKS, low_memory=False, core=False):
+    """
+    Frames of a seeded `NeoPixelFirefly` swarm and its extra strip,
+    rendering with `np`, or the pure python loops when it is None, on a
+    core PixelBuf with `core`
+    """
+    import board
+    import neopixel
+    import simulator
+
+    simulator.reset()
+    random.seed(4)
+    numpy = npfirefly.np
+    npfirefly.np = np
+    try:
+        with CorePixelBuf(npfirefly.blit, core):
+            extra = neopixel.NeoPixel(board.NEOPIXEL, 10, auto_write=False)
+            fireflies = npfirefly.NeoPixelFirefly(
+                board.A1,
+                FIREFLY_PIXELS,
+                brightness=0.4,
+                min_steps=4,
+                max_steps=16384,
+                extra_neopixels=[extra],
+                low_memory=low_memory,
+            )
+            strip = getattr(fireflies, "neopixels", fireflies)
+            frames = []
+            for _ in range(ticks):
+                for _ in range(random.randint(0, 5)):
+                    final_color = None if random.random() < 0.2 else (0, 0, 0)
+                    fireflies.flicker(final_color=final_color)
+                fireflies.update()
+                fireflies.show()
+                frames.append(
+                    bytes(strip._post_brightness_buffer)
+                    + bytes(extra._post_brightness_buffer)
+                )
+    finally:
+        npfirefly.np = numpy
+    return frames
+
+
+def check_low_memory():
+    """
+    `low_memory` frames against the default ones. The rainbow is
+    compared with a default one of as many color table steps.
+    """
+    nprainbow = load("aegean_sea", "nprainbow")
+    steps = nprainbow.NeoPixelRainbow.low_memory_steps
+    yield "rainbow low_memory", differences(
+        rainbow_frames(nprainbow, None, low_memory=True),
+        rainbow_frames(nprainbow, None, steps=steps),
+    ), 0, "frames"
+    for project in FIREFLY_PROJECTS:
+        npfirefly = load(project, "npfirefly")
+        yield "{} low_memory".format(project), differences(
+            firefly_frames(npfirefly, None, low_memory=True),
+            firefly_frames(npfirefly, None),
+        ), 0, "frames"
+
+
+def check_vector():
+    """
+    Frames rendered with NumPy, as `ulab` does on a board, against the
+    pure python loops
+    """
+    nprainbow = load("aegean_sea", "nprainbow")
+    np = nprainbow.np
+    if np is None:
+        print("vector: NumPy is not installed, skipped")
+        return
+    for rotate in (False, True):
+        yield "rainbow vector rotate={}".format(rotate), differences(
+            rainbow_frames(nprainbow, np, rotate=rotate),
+            rainbow_frames(nprainbow, None, rotate=rotate),
+        ), 0, "frames"
+    for project in FIREFLY_PROJECTS:
+        npfirefly = load(project, "npfirefly")
+        yield "{} vector".format(project), differences(
+            firefly_frames(npfirefly, np), firefly_frames(npfirefly, None)
+        ), 0, "frames"
+
+
+def check_recorder():
+    """
+    Recordings decoded back against the frames the strip sent, for a
+    running and an idle rainbow, that skips its unchanged frames
+    """
+    import board
+    import simulator
+
+    nprainbow = load("aegean_sea", "nprainbow")
+    recorder = load("aegean_sea", "recorder")
+    for speed in (RAINBOW["speed"], 0):
+        simulator.reset()
+        options = dict(RAINBOW, speed=speed)
+        rainbow = nprainbow.NeoPixelRainbow(board.GP18, RAINBOW_PIXELS, **options)
+        # Frames sent before recording starts
+        sent = len(rainbow.frames)
+        stream = io.BytesIO()
+        with recorder.Recorder(rainbow, stream):
+            for _ in range(TICKS):
+                rainbow.update()
+                rainbow.show()
+        stream.seek(0)
+        step, n, order = recorder.read_header(stream)
+        recorded = [bytes(frame) for _, frame in recorder.frames(stream, step * n)]
+        transmitted = [frame for _, frame in list(rainbow.frames)[sent:]]
+        yield "recorder speed={}".format(speed), differences(
+            recorded, transmitted
+        ), 0, "frames"
+
+
+def check_core():
+    """
+    Effects on a core PixelBuf, where `blit` writes through
+    `__setitem__`: an idle rainbow renders and sends a single frame, with
+    and without rotate, and every effect sends the same frames as on the
+    python PixelBuf
+    """
+    import board
+    import simulator
+
+    nprainbow = load("aegean_sea", "nprainbow")
+    blit = nprainbow.blit
+    renders = [0]
+
+    def counting_blit(*args, **kwargs):
+        renders[0] += 1
+        blit(*args, **kwargs)
+
+    for rotate in (False, True):
+        simulator.reset()
+        nprainbow.blit = counting_blit
+        try:
+            with CorePixelBuf(blit):
+                options = dict(RAINBOW, speed=0, rotate=rotate)
+                rainbow = nprainbow.NeoPixelRainbow(
+                    board.GP18, RAINBOW_PIXELS, **options
+                )
+                # The black frame sent by the constructor
+                sent = len(rainbow.frames)
+                renders[0] = 0
+                for _ in range(TICKS):
+                    rainbow.update()
+                    rainbow.show()
+        finally:
+            nprainbow.blit = blit
+        label = "rainbow core idle rotate={}".format(rotate)
+        yield label + " renders", renders[0], 1, "renders"
+        yield label + " sent", len(rainbow.frames) - sent, 1, "frames"
+    np = nprainbow.np
+    for rotate in (False, True):
+        yield "rainbow core rotate={}".format(rotate), differences(
+            rainbow_frames(nprainbow, np, core=True, rotate=rotate),
+            rainbow_frames(nprainbow, np, rotate=rotate),
+        ), 0, "frames"
+    for project in FIREFLY_PROJECTS:
+        npfirefly = load(project, "npfirefly")
+        np = npfirefly.np
+        yield "{} core".format(project), differences(
+            firefly_frames(npfirefly, np, core=True), firefly_frames(npfirefly, np)
+        ), 0, "frames"
+
+
+CHECKS = (
+    ("curves", check_curves),
+    ("fades", check_fades),
+    ("hsv", check_hsv),
+    ("low_memory", check_low_memory),
+    ("vector", check_vector),
+    ("recorder", check_recorder),
+    ("core", check_core),
+)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--only", nargs="+", help="check names")
+    args = parser.parse_args()
+
+    from run import simulator
+
+    simulator.install()
+    failed = False
+    for name, check in CHECKS:
+        if args.only and name not in args.only:
+            continue
+        for label, error, bound, unit in check():
+            # Errors sitting right on their bound differ in the last bits
+            over = error > bound + 1e-9
+            failed = failed or over
+            print(
+                "{:44s} {:12.6g} {:10s} bound {:<12.6g}{}".format(
+                    label, error, unit, bound, "  FAIL" if over else ""
+                )
+            )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
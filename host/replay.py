@@ -0,0 +1,156 @@
+"""
+Replays and compares frame recordings made with `recorder.Recorder`.
+
+    python host/replay.py frames.bin
+    python host/replay.py frames.bin --play
+    python host/replay.py baseline.bin optimized.bin
+
+Prints the frame rate and jitter of a recording, plays it back in a
+true color terminal with `--play`, and diffs two recordings frame by
+frame.
+"""
+import argparse
+import math
+import sys
+import time
+
+from run import load
+
+recorder = load("aegean_sea", "recorder")
+
+
+class Recording:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as stream:
+            self.step, self.n, self.order = recorder.read_header(stream)
+            self.frames = [
+                (at, bytes(frame))
+                for at, frame in recorder.frames(stream, self.step * self.n)
+            ]
+            self.size = stream.tell()
+
+    def intervals(self):
+        """
+        Milliseconds between consecutive frames
+        """
+        return [(b[0] - a[0]) / 1000 for a, b in zip(self.frames, self.frames[1:])]
+
+    def colors(self, frame):
+        r, g, b = self.order
+        step = self.step
+        return [
+            (frame[j + r], frame[j + g], frame[j + b])
+            for j in range(0, len(frame), step)
+        ]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, (len(values) * p) // 100)]
+
+
+def summary(recording):
+    frames = recording.frames
+    lines = [
+        "{}: {} pixels, {} bytes per pixel, {} frames, {} bytes".format(
+            recording.path, recording.n, recording.step, len(frames), recording.size
+        )
+    ]
+    intervals = recording.intervals()
+    if intervals:
+        duration = frames[-1][0] - frames[0][0]
+        mean = sum(intervals) / len(intervals)
+        jitter = math.sqrt(sum((x - mean) ** 2 for x in intervals) / len(intervals))
+        changed = sum(a[1] != b[1] for a, b in zip(frames, frames[1:]))
+        lines.append(
+            "  {:.1f} s, {:.1f} fps, {} changed frames".format(
+                duration / 1e6, 1e6 * len(intervals) / max(duration, 1), changed
+            )
+        )
+        lines.append(
+            "  interval p50 {:.2f} ms  p90 {:.2f} ms  p99 {:.2f} ms  "
+            "max {:.2f} ms  jitter {:.2f} ms".format(
+                percentile(intervals, 50),
+                percentile(intervals, 90),
+                percentile(intervals, 99),
+                max(intervals),
+                jitter,
+            )
+        )
+    return "\n".join(lines)
+
+
+def diff(a, b):
+    """
+    Compares the frames of two recordings by position
+    """
+    if (a.step, a.n, a.order) != (b.step, b.n, b.order):
+        return "Recordings of different strips"
+    count = min(len(a.frames), len(b.frames))
+    different = 0
+    first = None
+    worst = 0
+    total = 0
+    for k in range(count):
+        fa = a.frames[k][1]
+        fb = b.frames[k][1]
+        if fa != fb:
+            different += 1
+            if first is None:
+                first = k
+            deviation = max(abs(x - y) for x, y in zip(fa, fb))
+            worst = max(worst, deviation)
+            total += sum(abs(x - y) for x, y in zip(fa, fb))
+    lines = [
+        "{} of {} frames differ, {} and {} frames recorded".format(
+            different, count, len(a.frames), len(b.frames)
+        )
+    ]
+    if first is not None:
+        lines.append(
+            "  first at frame {}, max byte difference {}, mean {:.3f}".format(
+                first, worst, total / (count * len(a.frames[0][1]))
+            )
+        )
+    return "\n".join(lines)
+
+
+def play(recording, speed=1.0):
+    """
+    Draws the frames as a row of colored blocks, at the recorded pace
+    """
+    start = time.perf_counter()
+    for at, frame in recording.frames:
+        delay = at / 1e6 / speed - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        row = "".join(
+            "\x1b[48;2;{};{};{}m ".format(*color) for color in recording.colors(frame)
+        )
+        sys.stdout.write("\r" + row + "\x1b[0m")
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("recordings", nargs="+", help="one or two recordings")
+    parser.add_argument("--play", action="store_true", help="play the frames back")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed")
+    args = parser.parse_args()
+    if len(args.recordings) > 2:
+        parser.error("at most two recordings")
+
+    recordings = [Recording(path) for path in args.recordings]
+    for recording in recordings:
+        print(summary(recording))
+    if len(recordings) == 2:
+        print(diff(*recordings))
+    if args.play:
+        for recording in recordings:
+            play(recording, args.speed)
+
+
+if __name__ == "__main__":
+    main()
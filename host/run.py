@@ -0,0 +1,105 @@
+"""
+Runs a project `code.py` on the host against the simulated hardware.
+
+    python host/run.py aegean_sea --seconds 10
+    python host/run.py anglerfish --path cotton_candy --frames 500
+
+Inputs may be scripted with `--script`, a python file run before the
+project with the `simulator` module in scope, e.g.:
+
+    simulator.source("A0", lambda t: 32768 + 20000 * math.sin(t))
+    simulator.source("GP7", lambda t: 2 < t < 2.1)
+"""
+import argparse
+import importlib.util
+import os
+import random
+import runpy
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(HOST_DIR)
+SIM_DIR = os.path.join(HOST_DIR, "sim")
+
+sys.path.insert(0, SIM_DIR)
+
+import simulator  # noqa: E402
+
+
+def project_dir(name):
+    path = name if os.path.isdir(name) else os.path.join(ROOT_DIR, name)
+    return os.path.abspath(path)
+
+
+def load(project, module):
+    """
+    Imports `module` from `project` as `<project>_<module>`, so modules
+    with the same name in different projects can be loaded together.
+    """
+    folder = project_dir(project)
+    if folder not in sys.path:
+        sys.path.insert(1, folder)
+    name = "{}_{}".format(os.path.basename(folder), module)
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(folder, module + ".py")
+    )
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def run(project, seconds=None, frames=None, paths=(), script=None, seed=None):
+    """
+    Runs `project` code.py until `seconds` of virtual time or `frames`
+    frames have passed. `paths` are extra folders to import from, for
+    libraries the project only ships compiled. Returns the wall clock
+    time spent.
+    """
+    random.seed(seed)
+    simulator.reset()
+    simulator.install()
+    folder = project_dir(project)
+    sys.path[1:1] = [folder] + [project_dir(p) for p in paths]
+    if script is not None:
+        runpy.run_path(script, init_globals={"simulator": simulator})
+    simulator.run_until(seconds=seconds, frames=frames)
+    start = time.perf_counter()
+    try:
+        runpy.run_path(os.path.join(folder, "code.py"), run_name="__main__")
+    except simulator.SimulationEnd:
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("project", help="project folder, like aegean_sea")
+    parser.add_argument("--seconds", type=float, help="virtual seconds to run")
+    parser.add_argument("--frames", type=int, help="frames to run")
+    parser.add_argument(
+        "--path", action="append", default=[], help="extra library folder"
+    )
+    parser.add_argument("--script", help="input script")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    if args.seconds is None and args.frames is None:
+        args.frames = 1000
+
+    elapsed = run(
+        args.project, args.seconds, args.frames, args.path, args.script, args.seed
+    )
+
+    print("virtual time: {:.3f} s".format(simulator.clock.now))
+    print("wall time:    {:.3f} s".format(elapsed))
+    for strip in simulator.strips:
+        print(
+            "{} {!r}: {} pixels, {} frames".format(
+                type(strip).__name__, strip.pin, len(strip), len(strip.frames)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
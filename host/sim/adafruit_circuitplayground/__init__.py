@@ -0,0 +1,88 @@
+"""
+Simulated `adafruit_circuitplayground` module. Sensors and buttons read
+the `simulator.source` named after them: `"BUTTON_A"`, `"BUTTON_B"`,
+`"SLIDE_SWITCH"`, `"LIGHT"`, `"SOUND_LEVEL"` and `"TEMPERATURE"`. The
+microphone records `"MICROPHONE_DATA"`.
+
+Like the library on a Circuit Playground Bluefruit, `cp` is a
+`Bluefruit`, the only driver holding the microphone in `_mic`.
+"""
+import analogio
+import audiobusio
+import board
+import digitalio
+import neopixel
+import simulator
+
+
+class Photocell:
+    """The light sensor wrapper of the library, holding its `AnalogIn`"""
+
+    def __init__(self, pin):
+        self._photocell = analogio.AnalogIn(pin)
+
+    @property
+    def light(self):
+        return simulator.read("LIGHT", 300)
+
+
+class CircuitPlaygroundBase:
+    def __init__(self):
+        self._pixels = neopixel.NeoPixel(
+            board.NEOPIXEL, 10, brightness=0.3, auto_write=True
+        )
+        self._a = digitalio.DigitalInOut(board.BUTTON_A)
+        self._a.switch_to_input(pull=digitalio.Pull.DOWN)
+        self._b = digitalio.DigitalInOut(board.BUTTON_B)
+        self._b.switch_to_input(pull=digitalio.Pull.DOWN)
+        self._light = Photocell(board.LIGHT)
+
+    @property
+    def pixels(self):
+        return self._pixels
+
+    @property
+    def button_a(self):
+        return self._a.value
+
+    @property
+    def button_b(self):
+        return self._b.value
+
+    @property
+    def switch(self):
+        return bool(simulator.read("SLIDE_SWITCH", True))
+
+    @property
+    def light(self):
+        return self._light.light
+
+    @property
+    def temperature(self):
+        return simulator.read("TEMPERATURE", 25.0)
+
+    @property
+    def red_led(self):
+        return simulator.outputs.get("D13", False)
+
+    @red_led.setter
+    def red_led(self, value):
+        simulator.outputs["D13"] = bool(value)
+
+
+class Bluefruit(CircuitPlaygroundBase):
+    def __init__(self):
+        super().__init__()
+        self._mic = audiobusio.PDMIn(
+            board.MICROPHONE_CLOCK,
+            board.MICROPHONE_DATA,
+            sample_rate=16000,
+            bit_depth=16,
+        )
+
+    @property
+    def sound_level(self):
+        return simulator.read("SOUND_LEVEL", 50)
+
+
+cp = Bluefruit()
@@ -0,0 +1,64 @@
+"""
+Simulated `adafruit_dotstar` module. Every `show` is recorded in the
+strip `frames` by `simulator.transmit`.
+"""
+import adafruit_pixelbuf
+import simulator
+
+RBG = "PRBG"
+RGB = "PRGB"
+GRB = "PGRB"
+GBR = "PGBR"
+BRG = "PBRG"
+BGR = "PBGR"
+
+START_HEADER_SIZE = 4
+
+
+class DotStar(adafruit_pixelbuf.PixelBuf):
+    def __init__(
+        self,
+        clock,
+        data,
+        n,
+        *,
+        brightness=1.0,
+        auto_write=True,
+        pixel_order=BGR,
+        baudrate=4000000
+    ):
+        self._clock = clock
+        self._data = data
+        self.pin = data
+        self.baudrate = baudrate
+        if len(pixel_order) == 3:
+            pixel_order = "P" + pixel_order
+        trailer_size = n // 16
+        if n % 16 != 0:
+            trailer_size += 1
+        simulator.register(self)
+        super().__init__(
+            n,
+            byteorder=pixel_order,
+            brightness=brightness,
+            auto_write=auto_write,
+            header=bytearray(START_HEADER_SIZE),
+            trailer=bytearray(b"\xff") * trailer_size,
+        )
+
+    def deinit(self):
+        self.fill(0)
+        self.show()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.deinit()
+
+    @property
+    def n(self):
+        return len(self)
+
+    def _transmit(self, buffer):
+        simulator.transmit(self, buffer, self.baudrate)
@@ -0,0 +1,240 @@
+"""
+Simulated `adafruit_pixelbuf` module.
+
+Mirrors the buffers and attributes of the pure python PixelBuf shipped
+in the projects `lib` folders, so the fast paths in `npblit` run on
+host exactly as they do on the boards.
+"""
+
+DOTSTAR_LED_START = 0b11100000
+DOTSTAR_LED_BRIGHTNESS = 0b00011111
+
+
+class PixelBuf:
+    def __init__(
+        self,
+        n,
+        byteorder="BGR",
+        brightness=1.0,
+        auto_write=False,
+        header=None,
+        trailer=None,
+    ):
+        bpp, byteorder_tuple, has_white, dotstar_mode = self.parse_byteorder(byteorder)
+        self.auto_write = False
+        effective_bpp = 4 if dotstar_mode else bpp
+        _bytes = effective_bpp * n
+        buf = bytearray(_bytes)
+        offset = 0
+        if header is not None:
+            buf = bytearray(header) + buf
+            offset = len(header)
+        if trailer is not None:
+            buf += bytearray(trailer)
+        self._pixels = n
+        self._bytes = _bytes
+        self._byteorder = byteorder_tuple
+        self._byteorder_string = byteorder
+        self._has_white = has_white
+        self._bpp = bpp
+        self._pre_brightness_buffer = None
+        self._post_brightness_buffer = buf
+        self._offset = offset
+        self._dotstar_mode = dotstar_mode
+        self._pixel_step = effective_bpp
+        if dotstar_mode:
+            for i in range(offset, offset + _bytes, 4):
+                buf[i + byteorder_tuple[3]] = DOTSTAR_LED_START | DOTSTAR_LED_BRIGHTNESS
+        self._brightness = 1.0
+        self.brightness = brightness
+        self.auto_write = auto_write
+
+    @staticmethod
+    def parse_byteorder(byteorder):
+        bpp = len(byteorder)
+        dotstar_mode = False
+        has_white = False
+        if byteorder.strip("RGBWP") != "":
+            raise ValueError("Invalid Byteorder string")
+        try:
+            r = byteorder.index("R")
+            g = byteorder.index("G")
+            b = byteorder.index("B")
+        except ValueError as exc:
+            raise ValueError("Invalid Byteorder string") from exc
+        if "W" in byteorder:
+            w = byteorder.index("W")
+            byteorder = (r, g, b, w)
+            has_white = True
+        elif "P" in byteorder:
+            lum = byteorder.index("P")
+            byteorder = (r, g, b, lum)
+            dotstar_mode = True
+        else:
+            byteorder = (r, g, b)
+        return bpp, byteorder, has_white, dotstar_mode
+
+    @property
+    def bpp(self):
+        return self._bpp
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        value = min(max(value, 0.0), 1.0)
+        change = value - self._brightness
+        if -0.001 < change < 0.001:
+            return
+        self._brightness = value
+        if self._pre_brightness_buffer is None:
+            self._pre_brightness_buffer = bytearray(self._post_brightness_buffer)
+        offset_check = self._offset % self._pixel_step
+        for i in range(self._offset, self._bytes + self._offset):
+            # Don't adjust per-pixel luminance bytes in dotstar mode
+            if self._dotstar_mode and (i % 4 != offset_check):
+                continue
+            self._post_brightness_buffer[i] = int(
+                self._pre_brightness_buffer[i] * self._brightness
+            )
+        if self.auto_write:
+            self.show()
+
+    @property
+    def byteorder(self):
+        return self._byteorder_string
+
+    def __len__(self):
+        return self._pixels
+
+    @property
+    def n(self):
+        return self._pixels
+
+    def show(self):
+        return self._transmit(self._post_brightness_buffer)
+
+    def fill(self, color):
+        r, g, b, w = self._parse_color(color)
+        for i in range(self._pixels):
+            self._set_item(i, r, g, b, w)
+        if self.auto_write:
+            self.show()
+
+    def _parse_color(self, value):
+        r = 0
+        g = 0
+        b = 0
+        w = 0
+        if isinstance(value, int):
+            r = value >> 16
+            g = (value >> 8) & 0xFF
+            b = value & 0xFF
+            w = 0
+            if self._dotstar_mode:
+                w = 1.0
+        else:
+            if len(value) < 3 or len(value) > 4:
+                raise ValueError(
+                    "Expected tuple of length {}, got {}".format(self._bpp, len(value))
+                )
+            if len(value) == self._bpp:
+                if self._bpp == 3:
+                    r, g, b = value
+                else:
+                    r, g, b, w = value
+            elif len(value) == 3:
+                r, g, b = value
+                if self._dotstar_mode:
+                    w = 1.0
+        if self._bpp == 4:
+            if self._dotstar_mode:
+                # LED startframe is three "1" bits, followed by 5 brightness bits
+                w = (int(w * 31) & 0b00011111) | DOTSTAR_LED_START
+            elif self._has_white and r == g == b:
+                w = r
+                r = 0
+                g = 0
+                b = 0
+        return (r, g, b, w)
+
+    def _set_item(self, index, r, g, b, w):
+        if index < 0:
+            index += len(self)
+        if index >= self._pixels or index < 0:
+            raise IndexError
+        offset = self._offset + (index * self._pixel_step)
+        if self._pre_brightness_buffer is not None:
+            if self._bpp == 4:
+                self._pre_brightness_buffer[offset + self._byteorder[3]] = w
+            self._pre_brightness_buffer[offset + self._byteorder[0]] = r
+            self._pre_brightness_buffer[offset + self._byteorder[1]] = g
+            self._pre_brightness_buffer[offset + self._byteorder[2]] = b
+        if self._bpp == 4:
+            # Only apply brightness if w is actually white (aka not DotStar.)
+            if not self._dotstar_mode:
+                w = int(w * self._brightness)
+            self._post_brightness_buffer[offset + self._byteorder[3]] = w
+        self._post_brightness_buffer[offset + self._byteorder[0]] = int(
+            r * self._brightness
+        )
+        self._post_brightness_buffer[offset + self._byteorder[1]] = int(
+            g * self._brightness
+        )
+        self._post_brightness_buffer[offset + self._byteorder[2]] = int(
+            b * self._brightness
+        )
+
+    def __setitem__(self, index, val):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._pixels)
+            indices = range(start, stop, step)
+            if len(val) == len(indices) * self._bpp and len(val) != len(indices):
+                # Flat channel values, taken by the core PixelBuf too
+                bpp = self._bpp
+                val = [tuple(val[j : j + bpp]) for j in range(0, len(val), bpp)]
+            for val_i, in_i in enumerate(indices):
+                r, g, b, w = self._parse_color(val[val_i])
+                self._set_item(in_i, r, g, b, w)
+        else:
+            r, g, b, w = self._parse_color(val)
+            self._set_item(index, r, g, b, w)
+        if self.auto_write:
+            self.show()
+
+    def _getitem(self, index):
+        start = self._offset + (index * self._pixel_step)
+        buffer = (
+            self._pre_brightness_buffer
+            if self._pre_brightness_buffer is not None
+            else self._post_brightness_buffer
+        )
+        value = [
+            buffer[start + self._byteorder[0]],
+            buffer[start + self._byteorder[1]],
+            buffer[start + self._byteorder[2]],
+        ]
+        if self._has_white:
+            value.append(buffer[start + self._byteorder[3]])
+        elif self._dotstar_mode:
+            value.append(
+                (buffer[start + self._byteorder[3]] & DOTSTAR_LED_BRIGHTNESS) / 31.0
+            )
+        return value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            out = []
+            for in_i in range(*index.indices(self._pixels)):
+                out.append(self._getitem(in_i))
+            return out
+        if index < 0:
+            index += len(self)
+        if index >= self._pixels or index < 0:
+            raise IndexError
+        return self._getitem(index)
+
+    def _transmit(self, buffer):
+        raise NotImplementedError("Must be subclassed")
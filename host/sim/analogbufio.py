@@ -0,0 +1,30 @@
+"""
+Simulated `analogbufio` module. Each `readinto` samples the
+`simulator.source` of the pin at `sample_rate` over virtual time and
+advances the clock by the capture duration.
+"""
+import simulator
+
+
+class BufferedIn:
+    def __init__(self, pin, *, sample_rate):
+        self.pin = pin
+        self.sample_rate = sample_rate
+
+    def readinto(self, buffer):
+        start = simulator.clock.now
+        n = len(buffer)
+        for i in range(n):
+            value = simulator.read(self.pin.name, 32768, start + i / self.sample_rate)
+            buffer[i] = int(value) & 0xFFFF
+        simulator.clock.advance(n / self.sample_rate)
+        return n
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
@@ -0,0 +1,24 @@
+"""
+Simulated `analogio` module. Readings come from `simulator.source`.
+"""
+import simulator
+
+
+class AnalogIn:
+    reference_voltage = 3.3
+
+    def __init__(self, pin):
+        self.pin = pin
+
+    @property
+    def value(self):
+        return int(simulator.read(self.pin.name, 32768)) & 0xFFFF
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
@@ -0,0 +1,45 @@
+"""
+Simulated `audiobusio` module. `PDMIn` records the `simulator.source`
+named after its data pin, like `"MICROPHONE_DATA"`, at `sample_rate`
+over virtual time, and advances the clock by the recording duration.
+"""
+import simulator
+
+
+class PDMIn:
+    def __init__(
+        self,
+        clock_pin,
+        data_pin,
+        *,
+        sample_rate=16000,
+        bit_depth=8,
+        mono=True,
+        oversample=64,
+        startup_delay=0.11,
+    ):
+        self.clock_pin = clock_pin
+        self.data_pin = data_pin
+        self.sample_rate = sample_rate
+        self.bit_depth = bit_depth
+
+    def record(self, destination, destination_length):
+        start = simulator.clock.now
+        silence = 1 << (self.bit_depth - 1)
+        mask = (1 << self.bit_depth) - 1
+        for i in range(destination_length):
+            value = simulator.read(
+                self.data_pin.name, silence, start + i / self.sample_rate
+            )
+            destination[i] = int(value) & mask
+        simulator.clock.advance(destination_length / self.sample_rate)
+        return destination_length
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
@@ -0,0 +1,23 @@
+"""
+Simulated `board` module. Any pin name is available.
+"""
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+
+_pins = {}
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    pin = _pins.get(name)
+    if pin is None:
+        pin = _pins[name] = Pin(name)
+    return pin
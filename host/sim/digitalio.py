@@ -0,0 +1,54 @@
+"""
+Simulated `digitalio` module. Inputs come from `simulator.source` and
+outputs are stored in `simulator.outputs`.
+"""
+import simulator
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.value = value
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    @property
+    def value(self):
+        if self.direction == Direction.OUTPUT:
+            return simulator.outputs.get(self.pin.name, False)
+        return bool(simulator.read(self.pin.name, self.pull == Pull.UP))
+
+    @value.setter
+    def value(self, value):
+        simulator.outputs[self.pin.name] = bool(value)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
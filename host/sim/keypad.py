@@ -0,0 +1,116 @@
+"""
+Simulated `keypad` module. Keys read the `simulator.source` named after
+their pin. They are scanned every `interval` of virtual time, catching
+up whenever the event queue is read, so presses shorter than a frame
+are queued like on the board.
+"""
+from collections import deque
+import simulator
+import supervisor
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = supervisor.ticks_ms() if timestamp is None else timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return self.key_number == other.key_number and self.pressed == other.pressed
+
+    def __hash__(self):
+        return hash((self.key_number, self.pressed))
+
+    def __repr__(self):
+        return "<Event: key_number {} {}>".format(
+            self.key_number, "pressed" if self.pressed else "released"
+        )
+
+
+class EventQueue:
+    def __init__(self, scanner, max_events):
+        self._scanner = scanner
+        self._events = deque()
+        self._max_events = max_events
+        self.overflowed = False
+
+    def _put(self, event):
+        if len(self._events) >= self._max_events:
+            self.overflowed = True
+        else:
+            self._events.append(event)
+
+    def get(self):
+        self._scanner._scan()
+        if self._events:
+            return self._events.popleft()
+        return None
+
+    def get_into(self, event):
+        self._scanner._scan()
+        if not self._events:
+            return False
+        queued = self._events.popleft()
+        event.key_number = queued.key_number
+        event.pressed = queued.pressed
+        event.timestamp = queued.timestamp
+        return True
+
+    def clear(self):
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self):
+        self._scanner._scan()
+        return len(self._events)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class Keys:
+    def __init__(
+        self,
+        pins,
+        *,
+        value_when_pressed,
+        pull=True,
+        interval=0.02,
+        max_events=64,
+    ):
+        self.pins = list(pins)
+        self.key_count = len(self.pins)
+        self.value_when_pressed = value_when_pressed
+        self.interval = interval
+        # Level read from a pin nobody scripted
+        self._idle = (not value_when_pressed) if pull else False
+        self.events = EventQueue(self, max_events)
+        self.reset()
+
+    def reset(self):
+        self._pressed = [False] * self.key_count
+        self._last_scan = simulator.clock.now
+
+    def _scan(self):
+        while self._last_scan + self.interval <= simulator.clock.now:
+            self._last_scan += self.interval
+            for i, pin in enumerate(self.pins):
+                value = bool(simulator.read(pin.name, self._idle, self._last_scan))
+                pressed = value == self.value_when_pressed
+                if pressed != self._pressed[i]:
+                    self._pressed[i] = pressed
+                    timestamp = supervisor.ticks_at(self._last_scan)
+                    self.events._put(Event(i, pressed, timestamp))
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
@@ -0,0 +1,7 @@
+"""
+Simulated `micropython` module.
+"""
+
+
+def const(value):
+    return value
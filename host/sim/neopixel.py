@@ -0,0 +1,50 @@
+"""
+Simulated `neopixel` module. Every `show` is recorded in the strip
+`frames` by `simulator.transmit`.
+"""
+import adafruit_pixelbuf
+import simulator
+
+RGB = "RGB"
+GRB = "GRB"
+RGBW = "RGBW"
+GRBW = "GRBW"
+
+
+class NeoPixel(adafruit_pixelbuf.PixelBuf):
+    def __init__(
+        self, pin, n, *, bpp=3, brightness=1.0, auto_write=True, pixel_order=None
+    ):
+        if not pixel_order:
+            pixel_order = GRB if bpp == 3 else GRBW
+        elif isinstance(pixel_order, tuple):
+            order_list = [RGBW[order] for order in pixel_order]
+            pixel_order = "".join(order_list)
+        self.pin = pin
+        simulator.register(self)
+        super().__init__(
+            n, brightness=brightness, byteorder=pixel_order, auto_write=auto_write
+        )
+
+    def deinit(self):
+        self.fill(0)
+        self.show()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.deinit()
+
+    def __repr__(self):
+        return "[" + ", ".join([str(x) for x in self]) + "]"
+
+    @property
+    def n(self):
+        return len(self)
+
+    def write(self):
+        self.show()
+
+    def _transmit(self, buffer):
+        simulator.transmit(self, buffer)
@@ -0,0 +1,176 @@
+"""
+Simulated hardware state shared by the stand-in CircuitPython modules.
+
+Inputs are scripted with `source`, NeoPixel frames are recorded in
+`strips` and time is kept by a virtual `clock`, installed over
+`time.monotonic` and `time.sleep` with `install`.
+"""
+import asyncio
+from collections import deque
+import selectors
+import time
+
+
+class SimulationEnd(BaseException):
+    """
+    Raised when the simulation reaches its time or frame limit. It is a
+    `BaseException` so the simulated code can not swallow it.
+    """
+
+
+class VirtualClock:
+    """
+    Monotonic clock that only moves when something happens: each read
+    costs `tick` seconds, a strip transfer costs its wire time and
+    `sleep` jumps ahead.
+    """
+
+    tick = 10e-6
+
+    def __init__(self):
+        self.now = 0.0
+        self.deadline = None
+
+    def advance(self, seconds):
+        self.now += seconds
+        if self.deadline is not None and self.now >= self.deadline:
+            end()
+
+    def monotonic(self):
+        self.advance(self.tick)
+        return self.now
+
+    def monotonic_ns(self):
+        return int(self.monotonic() * 1e9)
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+
+clock = VirtualClock()
+strips = []
+outputs = {}
+frame_history = 10000
+max_frames = None
+ended = False
+_sources = {}
+_defaults = {}
+_frames = 0
+
+
+def source(name, value):
+    """
+    Scripts the input named `name` (the board pin name, like `"A0"`, or
+    a Circuit Playground sensor, like `"SOUND_LEVEL"`). `value` is a
+    constant or a function of the virtual time.
+    """
+    _sources[name] = value
+
+
+def default(name, value):
+    """
+    Value of the input `name` when it was not scripted.
+    """
+    _defaults[name] = value
+
+
+def read(name, fallback=0, at=None):
+    """
+    Value of the input `name` now, or at the virtual time `at`.
+    """
+    value = _sources.get(name, _defaults.get(name, fallback))
+    if callable(value):
+        return value(clock.now if at is None else at)
+    return value
+
+
+def register(strip):
+    strip.frames = deque((), frame_history)
+    strips.append(strip)
+
+
+def transmit(strip, buffer, bit_rate=800000):
+    """
+    Records a frame sent by `strip` and advances the clock by the time
+    it takes on the wire.
+    """
+    global _frames
+    strip.frames.append((clock.now, bytes(buffer)))
+    _frames += 1
+    clock.advance(len(buffer) * 8 / bit_rate)
+    if max_frames is not None and _frames >= max_frames:
+        end()
+
+
+def end():
+    global ended
+    ended = True
+    raise SimulationEnd()
+
+
+def frames():
+    """
+    Number of frames transmitted by all strips.
+    """
+    return _frames
+
+
+def run_until(seconds=None, frames=None):
+    """
+    Ends the simulation after `seconds` of virtual time or `frames`
+    transmitted frames.
+    """
+    global max_frames
+    clock.deadline = None if seconds is None else clock.now + seconds
+    max_frames = None if frames is None else _frames + frames
+
+
+def reset():
+    """
+    Forgets every strip, input script and output, and restarts the clock.
+    """
+    global _frames, max_frames, ended
+    clock.now = 0.0
+    ended = False
+    clock.deadline = None
+    max_frames = None
+    _frames = 0
+    strips.clear()
+    outputs.clear()
+    _sources.clear()
+
+
+class VirtualSelector(selectors.SelectSelector):
+    """
+    Selector that advances the virtual clock instead of waiting, so
+    asyncio sleeps take no wall time.
+    """
+
+    def select(self, timeout=None):
+        if timeout is not None and timeout > 0:
+            clock.sleep(timeout)
+        return super().select(0)
+
+
+def _exception_handler(loop, context):
+    # Tasks left pending when the simulation ends are expected
+    if not ended:
+        loop.default_exception_handler(context)
+
+
+class VirtualEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self):
+        loop = asyncio.SelectorEventLoop(VirtualSelector())
+        loop.set_exception_handler(_exception_handler)
+        return loop
+
+
+def install():
+    """
+    Replaces `time.monotonic` and `time.sleep` with the virtual clock,
+    and makes asyncio event loops run on it.
+    """
+    time.monotonic = clock.monotonic
+    time.monotonic_ns = clock.monotonic_ns
+    time.sleep = clock.sleep
+    asyncio.set_event_loop_policy(VirtualEventLoopPolicy())
@@ -0,0 +1,17 @@
+"""
+Simulated `supervisor` module, ticking with the virtual clock.
+"""
+import simulator
+
+_TICKS_MAX = (1 << 29) - 1
+
+
+def ticks_at(seconds):
+    """
+    `ticks_ms` value at `seconds` of virtual time.
+    """
+    return int(seconds * 1000) & _TICKS_MAX
+
+
+def ticks_ms():
+    return ticks_at(simulator.clock.now)
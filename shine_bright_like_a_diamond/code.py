@@ -2,9 +2,13 @@
 import random
 import board
 from adafruit_dotstar import DotStar
-from analogio import AnalogIn
 from micropython import const
+from filters import Filter
+from memory import memory_report
 import npfirefly
+from recorder import Recorder
+from sampler import Sampler
+from scheduler import Scheduler
 
 
 # Vibration sensor configuration
@@ -12,6 +16,9 @@ SENSOR_WINDOW = 16  # Moving average window
 SENSOR_MEAN_MIN_DEV_PERC = 0.06  # Mean minimum deviation in percent value
 SENSOR_MIN_OUTLIERS = 5  # Baseline measure
 SENSOR_MIN_FLICKER = 0.01  # Sensor minimum flicker
+SENSOR_RATE = 100  # Sensor readings per second
+SENSOR_BLOCK = 8  # Samples captured at each reading
+SENSOR_SAMPLE_RATE = 2000  # Samples per second within a block
 
 # NeoPixels configuration
 PIXEL_PIN = board.A1  # Adafruit Gemma M0
@@ -22,6 +29,19 @@ MAX_STEPS = 32  # Maximum firefly flicker timesteps
 RED_RANGE = (127, 255)  # Red random color range
 GREEN_RANGE = (15, 63)  # Green random color range
 BLUE_RANGE = (0, 7)  # Blue random color range
+FRAME_RATE = 60  # Frames per second
+
+# Smaller buffers for boards with little RAM, like the SAMD21 ones
+LOW_MEMORY = False
+MEMORY_REPORT = False  # Print the bytes held by each component at boot
+
+# Garbage collection between frames rather than in the middle of one
+GC_IDLE = None  # Idle seconds needed to collect, like 0.005. None disables it
+GC_AFTER = 4096  # Bytes allocated before collecting again
+
+# Frame recording, see recorder.py. Writing to CIRCUITPY needs boot.py
+RECORD_PATH = None  # File the frames are recorded to, like "/frames.bin"
+RECORD_FRAMES = 3000  # Frames recorded at most
 
 
 class VibrationOutliers:
@@ -29,40 +49,53 @@ class VibrationOutliers:
     Measures the sensor at `port` with the `update` method and returns
     the number of detected outliers (values above `mean_dev` percent of
     the mean.
+
+    Each read captures a block of `block_size` samples, and counts as an
+    outlier when any of them is, so short shakes between reads are not
+    missed.
     """
 
-    def __init__(self, port, window_size, mean_min_dev_perc=0.1):
+    def __init__(
+        self,
+        port,
+        window_size,
+        mean_min_dev_perc=0.1,
+        block_size=SENSOR_BLOCK,
+        sample_rate=SENSOR_SAMPLE_RATE,
+    ):
         self.port = port
         self.window_size = window_size
         self.mean_min_dev_perc = mean_min_dev_perc
-        self.sensor = AnalogIn(port)
         w = 8  # Baseline window multiplier
-        self.read_batch(w * self.window_size)  # Warmup
-        mean = sum(self.read_batch(w * self.window_size)) / (self.window_size * w)
+        baseline = Sampler(port, w * self.window_size, sample_rate)
+        baseline.read()  # Warmup
+        mean = baseline.read()
+        baseline.deinit()
         self.threshold = mean + mean * self.mean_min_dev_perc
-        self._read = [0] * window_size
-
-    def read_batch(self, n):
-        """
-        Returns several reads
-        """
-        return [self.sensor.value for _ in range(n)]
+        self.sampler = Sampler(port, block_size, sample_rate, self.threshold)
+        self._read = Filter(window_size, typecode="B")
 
     def read(self):
         """
         Makes another read
         """
-        value = self.sensor.value > self.threshold
-        self._read.pop(0)
-        self._read.append(value)
+        self.sampler.read()
+        value = self.sampler.above > 0
+        self._read.add(value)
         return value
 
+    def memory(self):
+        """
+        Buffers held by the sensor, by name
+        """
+        return {"samples": self.sampler.buffer, "window": self._read.window}
+
     @property
     def outliers(self):
         """
         Returns the number of outliers currently in the window
         """
-        return sum(self._read)
+        return self._read.total
 
 
 def main():
@@ -78,14 +111,19 @@ def main():
         red_range=RED_RANGE,
         green_range=GREEN_RANGE,
         blue_range=BLUE_RANGE,
+        auto_write=False,
+        low_memory=LOW_MEMORY,
         extra_neopixels=[
             # Board LED
-            DotStar(board.APA102_SCK, board.APA102_MOSI, 1, auto_write=True)
+            DotStar(board.APA102_SCK, board.APA102_MOSI, 1, auto_write=False)
         ],
     ) as fireflies:
-        while True:
-            # Reads sensor
-            vibration_sensor.read()
+        if RECORD_PATH is not None:
+            Recorder(fireflies, open(RECORD_PATH, "wb"), max_frames=RECORD_FRAMES)
+        if MEMORY_REPORT:
+            memory_report([("Fireflies", fireflies), ("Vibration", vibration_sensor)])
+
+        def render(dt):
             new_fireflies = (vibration_sensor.outliers - SENSOR_MIN_OUTLIERS) / const(
                 (SENSOR_WINDOW - SENSOR_MIN_OUTLIERS)
             )
@@ -99,6 +137,12 @@ def main():
                     for i in range(SENSOR_WINDOW):
                         fireflies.flicker(final_color=(0, 0, 0))
             fireflies.update()
+            fireflies.show()
+
+        scheduler = Scheduler(collect_idle=GC_IDLE, collect_after=GC_AFTER)
+        scheduler.every(1 / SENSOR_RATE, lambda dt: vibration_sensor.read())
+        scheduler.every(1 / FRAME_RATE, render)
+        scheduler.run()
 
 
 if __name__ == "__main__":
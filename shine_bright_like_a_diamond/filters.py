@@ -0,0 +1,89 @@
+"""
+Sensor filters
+"""
+from array import array
+
+
+class Filter:
+    """
+    Smooths a stream of integer samples over a window of `window_size`
+    samples kept in a ring buffer. `value` is updated once per sample by
+    `add`, without allocating:
+
+    * "mean": moving average, from a running `total`.
+    * "ema": exponential moving average, weighting new samples by about
+      `1 / window_size`.
+    * "median": moving median, from a sorted copy of the window.
+    """
+
+    MEAN = "mean"
+    EMA = "ema"
+    MEDIAN = "median"
+
+    def __init__(self, window_size, initial=0, mode=MEAN, typecode="H"):
+        if mode not in (self.MEAN, self.EMA, self.MEDIAN):
+            raise ValueError("Filter mode {} not implemented".format(mode))
+        self.window_size = window_size
+        self.mode = mode
+        self.window = array(typecode, [0] * window_size)
+        if mode == self.MEDIAN:
+            self._sorted = array(typecode, [0] * window_size)
+        self.shift = 0
+        while (2 << self.shift) <= window_size:
+            self.shift += 1
+        self.fill(initial)
+
+    def fill(self, value):
+        """
+        Sets every sample in the window to `value`
+        """
+        for i in range(self.window_size):
+            self.window[i] = value
+            if self.mode == self.MEDIAN:
+                self._sorted[i] = value
+        self.index = 0
+        self.total = value * self.window_size
+        self._ema = value << self.shift
+        self.value = value
+
+    def add(self, sample):
+        """
+        Pushes `sample` into the window and returns the filtered value
+        """
+        old = self.window[self.index]
+        self.window[self.index] = sample
+        self.index += 1
+        if self.index == self.window_size:
+            self.index = 0
+        self.total += sample - old
+        if self.mode == self.MEAN:
+            self.value = self.total // self.window_size
+        elif self.mode == self.EMA:
+            self._ema += sample - (self._ema >> self.shift)
+            self.value = self._ema >> self.shift
+        else:
+            self.value = self._replace_sorted(old, sample)
+        return self.value
+
+    def _replace_sorted(self, old, new):
+        """
+        Swaps `old` for `new` in the sorted window, shifting the values in
+        between, and returns the median.
+        """
+        s = self._sorted
+        i = 0
+        while s[i] != old:
+            i += 1
+        if new > old:
+            while i + 1 < self.window_size and s[i + 1] < new:
+                s[i] = s[i + 1]
+                i += 1
+        else:
+            while i > 0 and s[i - 1] > new:
+                s[i] = s[i - 1]
+                i -= 1
+        s[i] = new
+        half = self.window_size // 2
+        if self.window_size % 2:
+            return s[half]
+        return (s[half - 1] + s[half]) // 2
@@ -0,0 +1,100 @@
+"""
+Batched ADC sampling
+"""
+from array import array
+import math
+from analogio import AnalogIn
+
+try:
+    import analogbufio
+except ImportError:
+    analogbufio = None
+
+
+class Sampler:
+    """
+    Captures blocks of `size` readings of the ADC at `pin` into a
+    preallocated `array("H")`, in one `analogbufio.BufferedIn` call at
+    `sample_rate` where the port has it and from an `AnalogIn` loop
+    otherwise.
+
+    `read` captures a block and computes, in a single pass:
+
+    * `mean`: the mean reading.
+    * `rms`: root mean square of the readings around the mean, the AC
+      level of signals like sound and vibration.
+    * `above`: number of readings above `threshold`.
+    * `crossings`: number of times the readings crossed `threshold`.
+
+    When `threshold` is None the previous block mean is used.
+    """
+
+    def __init__(self, pin, size, sample_rate=10000, threshold=None):
+        self.size = size
+        self.threshold = threshold
+        self.buffer = array("H", [0] * size)
+        if analogbufio is not None:
+            self._buffered_in = analogbufio.BufferedIn(pin, sample_rate=sample_rate)
+            self._analog_in = None
+        else:
+            self._buffered_in = None
+            self._analog_in = AnalogIn(pin)
+        self.mean = 0
+        self.rms = 0
+        self.above = 0
+        self.crossings = 0
+
+    def read(self):
+        """
+        Captures a block and returns its mean
+        """
+        buffer = self.buffer
+        if self._buffered_in is not None:
+            self._buffered_in.readinto(buffer)
+        else:
+            analog_in = self._analog_in
+            for i in range(self.size):
+                buffer[i] = analog_in.value
+        self._analyze()
+        return self.mean
+
+    def _analyze(self):
+        threshold = self.threshold
+        if threshold is None:
+            threshold = self.mean
+        # Sum around the previous mean to keep the squares small
+        offset = int(self.mean)
+        total = 0
+        squares = 0
+        above = 0
+        crossings = 0
+        high = self.buffer[0] > threshold
+        for value in self.buffer:
+            deviation = value - offset
+            total += deviation
+            squares += deviation * deviation
+            if value > threshold:
+                above += 1
+                if not high:
+                    crossings += 1
+                    high = True
+            elif high:
+                crossings += 1
+                high = False
+        mean = total / self.size
+        self.mean = offset + mean
+        self.rms = math.sqrt(max(0, squares / self.size - mean * mean))
+        self.above = above
+        self.crossings = crossings
+
+    def memory(self):
+        """
+        Buffers held by the sampler, by name
+        """
+        return {"buffer": self.buffer}
+
+    def deinit(self):
+        if self._buffered_in is not None:
+            self._buffered_in.deinit()
+        else:
+            self._analog_in.deinit()
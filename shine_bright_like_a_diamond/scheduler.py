@@ -0,0 +1,233 @@
+"""
+Fixed rate task scheduler
+"""
+import gc
+import time
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# Bytes in use on the heap, on MicroPython and CircuitPython only
+_mem_alloc = getattr(gc, "mem_alloc", None)
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & _TICKS_MAX
+
+
+def ticks_diff(end, start):
+    """
+    Milliseconds from `start` to `end`, two `ticks_ms` that may have
+    wrapped around.
+    """
+    return ((end - start + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+class Task:
+    """
+    A callback run every `period` seconds. It is called with the time
+    elapsed since its previous run.
+
+    `late` counts runs that started more than half a period behind
+    schedule and `dropped` the periods skipped altogether. `due` and
+    `last` are `ticks_ms` timestamps.
+    """
+
+    def __init__(self, period, callback, name=None, now=0):
+        self.period = period
+        self.callback = callback
+        self.name = name
+        # The period in milliseconds. Its fraction of a tick is carried
+        # over to the next run, so the rate doesn't drift
+        self._period = period * 1000
+        self._fraction = 0
+        self.due = now
+        self.last = now
+        self.runs = 0
+        self.late = 0
+        self.dropped = 0
+
+    def run(self, now):
+        """
+        Runs the callback and books the next run
+        """
+        behind = ticks_diff(now, self.due)
+        missed = int(behind / self._period)
+        self.dropped += missed
+        if behind > self._period / 2:
+            self.late += 1
+        self.callback(ticks_diff(now, self.last) / 1000)
+        self.runs += 1
+        self.last = now
+        advance = (missed + 1) * self._period + self._fraction
+        whole = int(advance)
+        self._fraction = advance - whole
+        self.due = (self.due + whole) & _TICKS_MAX
+
+    async def loop(self, scheduler):
+        """
+        Runs the task as an asyncio coroutine until `scheduler` stops
+        """
+        clock = scheduler.clock
+        while not scheduler.stopped:
+            delay = ticks_diff(self.due, clock()) / 1000
+            # Always yield, so a task behind schedule can't starve the others
+            await asyncio.sleep(delay if delay > 0 else 0)
+            if scheduler.stopped:
+                break
+            self.run(clock())
+
+    def __str__(self):
+        return "{}: {} runs, {} late, {} dropped".format(
+            self.name, self.runs, self.late, self.dropped
+        )
+
+
+class Scheduler:
+    """
+    Runs tasks at their own fixed rates, sleeping until the next one is
+    due. Tasks run as asyncio coroutines when `asyncio` is available
+    and from a plain loop otherwise.
+
+    On a board, `asyncio` and the `adafruit_ticks` it imports come from
+    the library bundle. This project doesn't ship them in `lib`, so there
+    the tasks run from the plain loop unless both are copied to `lib`.
+
+    With `collect_idle`, garbage is collected between frames rather
+    than whenever the heap runs out, in the middle of one: `gc.collect`
+    is called while the next task is at least `collect_idle` seconds
+    away, once `collect_after` bytes were allocated since the previous
+    collection. Automatic collection is left on, in case the heap runs
+    out first. `collections` counts the idle collections.
+
+    `clock` returns `ticks_ms` milliseconds, `supervisor.ticks_ms` on a
+    board. Periods and sleeps are in seconds. The float
+    `time.monotonic` isn't used: it loses its millisecond resolution
+    after hours on a board.
+
+    Please check https://github.com/luxedo/gin_tonic/tree/main/shine_bright_like_a_diamond
+    for demo and examples.
+    """
+
+    def __init__(
+        self,
+        clock=ticks_ms,
+        sleep=time.sleep,
+        collect_idle=None,
+        collect_after=4096,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        self.tasks = []
+        self.stopped = False
+        self.collect_idle = collect_idle
+        self.collect_after = collect_after
+        self.collections = 0
+        self._allocated = 0
+
+    def every(self, period, callback, name=None):
+        """
+        Schedules `callback(dt)` every `period` seconds.
+        """
+        task = Task(period, callback, name, self.clock())
+        self.tasks.append(task)
+        return task
+
+    def step(self):
+        """
+        Runs the tasks that are due and returns the time until the next one.
+        """
+        now = self.clock()
+        for task in self.tasks:
+            if ticks_diff(now, task.due) >= 0:
+                task.run(now)
+        return self._idle()
+
+    def _idle(self):
+        """
+        Seconds until the next task is due
+        """
+        # A loop rather than `min` over a generator, which allocates
+        due = self.tasks[0].due
+        for task in self.tasks:
+            if ticks_diff(task.due, due) < 0:
+                due = task.due
+        return ticks_diff(due, self.clock()) / 1000
+
+    def collect(self, idle):
+        """
+        Collects the garbage when `idle`, the seconds until the next
+        task, leaves the time for it. Returns the idle time left.
+        """
+        if self.collect_idle is None or idle < self.collect_idle:
+            return idle
+        if _mem_alloc is not None:
+            if _mem_alloc() - self._allocated < self.collect_after:
+                return idle
+        gc.collect()
+        self.collections += 1
+        if _mem_alloc is not None:
+            self._allocated = _mem_alloc()
+        return self._idle()
+
+    def stop(self):
+        """
+        Makes `run` return after the running task
+        """
+        self.stopped = True
+
+    def _restart(self):
+        self.stopped = False
+        now = self.clock()
+        for task in self.tasks:
+            task.due = now
+            task.last = now
+            task._fraction = 0
+
+    async def run_async(self):
+        """
+        Runs the tasks as asyncio coroutines until `stop` is called.
+        Await it together with your own coroutines.
+        """
+        self._restart()
+        loops = [task.loop(self) for task in self.tasks]
+        if self.collect_idle is not None:
+            loops.append(self._collect_loop())
+        await asyncio.gather(*loops)
+
+    async def _collect_loop(self):
+        """
+        Collects the garbage between the runs of the tasks
+        """
+        while not self.stopped:
+            idle = self.collect(self._idle())
+            # Woken along with a due task, it measures again after it runs
+            await asyncio.sleep(idle if idle > 0 else 0)
+
+    def run(self):
+        """
+        Runs the tasks until `stop` is called
+        """
+        if asyncio is not None:
+            asyncio.run(self.run_async())
+            return
+        self._restart()
+        while not self.stopped:
+            idle = self.collect(self.step())
+            if idle > 0:
+                self.sleep(idle)
+
+    def __str__(self):
+        lines = [str(task) for task in self.tasks]
+        if self.collect_idle is not None:
+            lines.append("GC: {} idle collections".format(self.collections))
+        return "\n".join(lines)